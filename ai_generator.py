@@ -1,248 +1,344 @@
-import os
-import json
 import time
-import base64
-import io
+import asyncio
+import weakref
 import datetime
-import re
 from google import genai
 from google.genai import types
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+
+from config import Config
+from plan_cache import PlanCache
+from crop_fragments import CropFragmentStore
+from gemini_client import GeminiClient
+from charts import build_chart_series
+from crop_knowledge import estimate_crops
+from prompt_builder import garden_prompt, packed_prompt, PromptTokenCounter
+from plan_stream import PlanSectionParser, PLAN_SECTIONS
+from plan_schema import PlanValidator
+from metrics import span, count
 
 class GardenAIGenerator:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY", "").strip()
+    def __init__(self, config=None):
+        # A mapping such as app.config; defaults to the Config class settings
+        if config is None:
+            config = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+        self.api_key = (config.get('GEMINI_API_KEY') or "").strip()
         if self.api_key:
             print(f"DEBUG: Using API Key: {self.api_key[:4]}...{self.api_key[-4:]}")
         else:
             print("DEBUG: No API Key found!")
-        self.client = genai.Client(api_key=self.api_key)
+        http_options = types.HttpOptions(base_url=config['GEMINI_BASE_URL']) if config['GEMINI_BASE_URL'] else None
+        self.client = genai.Client(api_key=self.api_key, http_options=http_options)
+        self.gemini = GeminiClient(
+            self.client,
+            rpm=config['GEMINI_RPM'],
+            tpm=config['GEMINI_TPM'],
+            bucket_path=config['GEMINI_BUDGET_PATH'],
+            max_attempts=config['GEMINI_MAX_ATTEMPTS'],
+            max_wait=config['GEMINI_MAX_WAIT'],
+            breaker_threshold=config['GEMINI_BREAKER_THRESHOLD'],
+            breaker_reset=config['GEMINI_BREAKER_RESET']
+        )
         self.model_id = 'gemini-2.5-flash-lite'
+        self.token_counter = PromptTokenCounter(self.client, self.model_id, method=config['PROMPT_TOKEN_COUNTER'])
+        self.plan_validator = PlanValidator()
+        self.plan_cache = None
+        if config['PLAN_CACHE_ENABLED']:
+            self.plan_cache = PlanCache(
+                config['PLAN_CACHE_PATH'],
+                max_entries=config['PLAN_CACHE_MAX_ENTRIES'],
+                ttl=config['PLAN_CACHE_TTL']
+            )
+        self.crop_fragments = None
+        if config['CROP_FRAGMENTS_ENABLED']:
+            self.crop_fragments = CropFragmentStore(config['CROP_FRAGMENTS_PATH'], ttl=config['CROP_FRAGMENTS_TTL'])
+        self._http_options = http_options
+        self._async_state = weakref.WeakKeyDictionary()
+        self.async_max_concurrency = config['ASYNC_MAX_CONCURRENCY']
+
+    def _create_prompt(self, data, yield_crops=None):
+        return garden_prompt(data, yield_crops)
+
+    def _cached_plan(self, garden_data):
+        if self.plan_cache is not None:
+            cached = self.plan_cache.get(garden_data)
+            if cached is not None:
+                print("Serving plan from cache")
+                return self._adapt_cached_plan(garden_data, cached)
+        return None
+
+    def _prepare_prompt(self, garden_data):
+        # Crops whose yield/planting period we already know skip the LLM
+        fragments = {}
+        if self.crop_fragments is not None:
+            fragments = self.crop_fragments.lookup(garden_data)
+        missing = [c['name'] for c in garden_data['crops'] if c['name'] not in fragments]
+        
+        with span('prompt_build'):
+            prompt = self._create_prompt(garden_data, yield_crops=missing)
+        return prompt, missing, fragments
 
-    def _create_prompt(self, data):
-        """CRITICAL INSTRUCTION FOR CROP DISTRIBUTION:
-The user has already allocated specific square meters to each crop:
-{crops_list}
+    def _log_call(self, prompt, started, response):
+        """One line per Gemini call with prompt size and latency side by side."""
+        elapsed = time.perf_counter() - started
+        tokens, method = self.token_counter.count(prompt)
+        usage = getattr(response, 'usage_metadata', None)
+        billed = getattr(usage, 'prompt_token_count', None)
+        print(f"Gemini call: {elapsed:.2f}s, prompt {tokens} tokens ({method})"
+              + (f", {billed} billed" if billed is not None else ""))
 
-Your "crop_distribution" MUST reflect these EXACT percentages based on total garden size.
-Calculate: (crop area / total garden size) * 100 = percentage
+    def _generation_config(self):
+        return types.GenerateContentConfig(
+            response_mime_type='application/json',
+            temperature=0.7
+        )
 
-DO NOT invent your own distribution. Use the user's actual area allocation."""
-        crops_list = ", ".join([f"{c['name']} ({c['area']}sqm)" for c in data.get('crops', [])])
+    def _validated_plan(self, garden_data, data, missing, fixes=()):
+        # Gaps are filled from the local planner rather than discarding a paid answer
+        return self.plan_validator.normalize(
+            data, garden_data, missing,
+            lambda: self._get_fallback_plan(garden_data, 'incomplete answer'),
+            fixes
+        )
+
+    def _parse_plan(self, garden_data, text, missing):
+        """(plan, filled) from a model answer, repaired and checked against the schema."""
+        with span('json_parse'):
+            data, fixes = self.plan_validator.parse(text)
+            return self._validated_plan(garden_data, data, missing, fixes)
+
+    def _crop_distribution(self, garden_data):
+        total_size = garden_data['garden_size']
+        return {c['name']: f"{(c['area'] / total_size) * 100:.1f}%" for c in garden_data['crops']}
+
+    def _finish_plan(self, garden_data, plan_data, missing, fragments, filled=None):
+        # filled: sections (and their crops) the local planner supplied; only
+        # what the model answered is kept for later plans
+        filled = filled or {}
+        if self.crop_fragments is not None:
+            local_crops = {name for names in filled.values() for name in names}
+            self.crop_fragments.store(garden_data, plan_data, [n for n in missing if n not in local_crops])
+            self._merge_fragments(plan_data, fragments)
         
-        # Yield guidelines by crop type
-        yield_guidelines = """
-IMPORTANT YIELD GUIDELINES - Use these realistic ranges PER 100 SQM and SCALE APPROPRIATELY for the actual garden size:
-- Root vegetables (carrots, beets, radishes, parsnips): 80-120 kg
-- Potatoes: 80-150 kg
-- Tomatoes (field/open ground): 50-80 kg
-- Tomatoes (greenhouse): 100-200 kg
-- Cucumbers (field/open ground): 30-50 kg
-- Cucumbers (greenhouse): 80-150 kg
-- Leafy greens (lettuce, spinach, kale, chard): 15-25 kg
-- Peppers (bell, chili): 30-50 kg
-- Onions, garlic, leeks: 80-120 kg
-- Beans (all types): 30-50 kg
-- Peas: 20-40 kg
-- Cabbage, broccoli, cauliflower: 80-120 kg
-- Squash, zucchini: 50-80 kg
-- Melons: 40-60 kg
-- Corn: 20-30 kg
-- Herbs (basil, parsley, cilantro): 5-10 kg
-
-DO NOT EXCEED THESE RANGES. Be conservative and realistic, not optimistic.
-SCALE the yield based on the actual garden size. If garden is 50 sqm, use half of these values.
-"""
+        # 🔴 FORCE CORRECT CROP DISTRIBUTION - ADD THIS RIGHT HERE
+        # Override the AI's distribution with the correct one
+        if 'optimized_layout' not in plan_data:
+            plan_data['optimized_layout'] = {}
+        plan_data['optimized_layout']['crop_distribution'] = self._crop_distribution(garden_data)
         
-        return f"""
-                ROLE: Professional Horticulture Consultant. You are an expert in vegetable gardening and crop yield prediction.
-
-                CONTEXT: 
-                - Location: {data.get('location')} climate
-                - Garden size: {data.get('garden_size')} sqm
-                - Soil type: {data.get('soil_type')}
-                - Sunlight: {data.get('sunlight')}
-                - Growing environment: {data.get('garden_type')}
-                - Main goal: {data.get('main_goal')}
-                - Include pest prevention tips: {data.get('pest_prevention')}
-
-                CROPS TO PLAN: {crops_list}
-
-                {yield_guidelines}
-
-                TASK: Generate a comprehensive, data-driven garden plan for this specific location and garden size.
-
-                IMPORTANT:
-                1. Scale ALL yields to the ACTUAL garden size ({data.get('garden_size')} sqm), not per 100 sqm
-                2. Be conservative - it's better to underestimate than overestimate
-                3. Consider the specific growing environment (field vs greenhouse)
-                4. Account for crop spacing and companion planting
-
-                REQUIRED JSON STRUCTURE:
-                {{
-                "optimized_layout": {{
-                    "crop_distribution": {{ "crop_name": "percentage%" }},
-                    "spatial_arrangement": "Detailed description of how to arrange plants",
-                    "companion_planting": ["list of good companions", "plants to avoid"],
-                    "crop_rotation": "Rotation strategy for next season"
-                }},
-                "estimated_yield": {{ "crop_name": "range in kg/season (scaled to garden size)" }},
-                "planting_periods": {{ "crop_name": "sowing month - harvest month" }},
-                "smart_advice": {{
-                    "irrigation": "Specific watering schedule and method",
-                    "soil_management": "Fertilizer and amendment recommendations",
-                    "local_risks": "Climate-specific challenges for {data.get('location')}",
-                    "pest_prevention": "Organic pest control methods" if {data.get('pest_prevention')} else "Standard pest monitoring"
-                }},
-                "additional_tips": ["tip1", "tip2", "tip3"]
-                }}
-                """
+        # Charts are rendered when first requested; keep only the numbers here
+        plan_data['chart_series'] = build_chart_series(garden_data, plan_data)
+        plan_data['generated_at'] = datetime.datetime.now().isoformat()
+        if self.plan_cache is not None and not filled:
+            self.plan_cache.set(garden_data, plan_data)
+        return plan_data
 
     def generate_plan(self, garden_data):
-        prompt = self._create_prompt(garden_data)
+        cached = self._cached_plan(garden_data)
+        if cached is not None:
+            return cached
+
+        prompt, missing, fragments = self._prepare_prompt(garden_data)
     
-        for attempt in range(3):
-            try:
-                print(f"Using Gemini AI (Attempt {attempt+1})...")
-                response = self.client.models.generate_content(
+        try:
+            # Budget, backoff/retry and the circuit breaker live in GeminiClient
+            print("Using Gemini AI...")
+            started = time.perf_counter()
+            response = self.gemini.generate_content(
+                model=self.model_id,
+                contents=prompt,
+                config=self._generation_config()
+            )
+            self._log_call(prompt, started, response)
+            plan_data, filled = self._parse_plan(garden_data, response.text, missing)
+            return self._finish_plan(garden_data, plan_data, missing, fragments, filled)
+
+        except Exception as e:
+            print(f"AI generation failed: {e}")
+            count('fallback')
+            return self._get_fallback_plan(garden_data, str(e))
+
+    def _loop_state(self):
+        # The semaphore and the SDK's aio HTTP client are bound to the event
+        # loop that first used them, so keep one pair per running loop
+        loop = asyncio.get_running_loop()
+        state = self._async_state.get(loop)
+        if state is None:
+            state = (
+                asyncio.BoundedSemaphore(self.async_max_concurrency),
+                genai.Client(api_key=self.api_key, http_options=self._http_options)
+            )
+            self._async_state[loop] = state
+        return state
+
+    async def agenerate_plan(self, garden_data):
+        """Async twin of generate_plan using the SDK's aio client.
+
+        Waiting on Gemini holds no thread; the local work (cache and
+        fragment lookups) runs in the default executor.
+        """
+        cached = await asyncio.to_thread(self._cached_plan, garden_data)
+        if cached is not None:
+            return cached
+
+        prompt, missing, fragments = await asyncio.to_thread(self._prepare_prompt, garden_data)
+
+        try:
+            semaphore, client = self._loop_state()
+            async with semaphore:
+                print("Using Gemini AI (async)...")
+                started = time.perf_counter()
+                response = await self.gemini.agenerate_content(
                     model=self.model_id,
                     contents=prompt,
-                    config=types.GenerateContentConfig(
-                        response_mime_type='application/json',
-                        temperature=0.7
-                    )
+                    config=self._generation_config(),
+                    client=client
                 )
-                
-                plan_data = json.loads(response.text)
-                
-                # 🔴 FORCE CORRECT CROP DISTRIBUTION - ADD THIS RIGHT HERE
-                total_size = garden_data['garden_size']
-                correct_distribution = {}
-                for crop in garden_data['crops']:
-                    percentage = (crop['area'] / total_size) * 100
-                    correct_distribution[crop['name']] = f"{percentage:.1f}%"
-                
-                # Override the AI's distribution with the correct one
-                if 'optimized_layout' not in plan_data:
-                    plan_data['optimized_layout'] = {}
-                plan_data['optimized_layout']['crop_distribution'] = correct_distribution
-                
-                # Generate visuals based on the NEW plan_data
-                plan_data['visualizations'] = self._generate_visualizations(garden_data, plan_data)
-                plan_data['generated_at'] = datetime.datetime.now().isoformat()
-                return plan_data
-
-            except Exception as e:
-                if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                    wait_time = (attempt + 1) * 30
-                    print(f"Rate limit hit. Retrying in {wait_time}s...")
-                    if attempt < 2:
-                        time.sleep(wait_time)
+            await asyncio.to_thread(self._log_call, prompt, started, response)
+            plan_data, filled = await asyncio.to_thread(self._parse_plan, garden_data, response.text, missing)
+            return await asyncio.to_thread(self._finish_plan, garden_data, plan_data, missing, fragments, filled)
+
+        except Exception as e:
+            print(f"AI generation failed: {e}")
+            count('fallback')
+            return self._get_fallback_plan(garden_data, str(e))
+
+    def stream_plan(self, garden_data):
+        """Generate a plan with the SDK's streaming API.
+
+        Yields ('section', {'name', 'value'}) as each top-level section of
+        the answer completes, then ('done', plan_data). Cached and fallback
+        plans come out section by section as well.
+        """
+        cached = self._cached_plan(garden_data)
+        if cached is not None:
+            yield from self._plan_sections(cached)
+            yield 'done', cached
+            return
+
+        prompt, missing, fragments = self._prepare_prompt(garden_data)
+        parser = PlanSectionParser()
+        try:
+            print("Using Gemini AI (streaming)...")
+            started = time.perf_counter()
+            first_section = None
+            chunk = None
+            for chunk in self.gemini.generate_content_stream(
+                model=self.model_id,
+                contents=prompt,
+                config=self._generation_config()
+            ):
+                for name, value in parser.feed(chunk.text or ''):
+                    if name not in PLAN_SECTIONS:
                         continue
-                
-                print(f"AI generation failed: {e}")
-                return self._get_fallback_plan(garden_data, str(e))
+                    if first_section is None:
+                        first_section = time.perf_counter() - started
+                    yield 'section', {'name': name, 'value': self._preview_section(garden_data, name, value, fragments)}
+            self._log_call(prompt, started, chunk)
+            if first_section is not None:
+                print(f"First plan section streamed after {first_section:.2f}s")
+            plan_data, filled = self._parse_plan(garden_data, parser.text, missing)
+            plan_data = self._finish_plan(garden_data, plan_data, missing, fragments, filled)
+
+        except Exception as e:
+            print(f"AI generation failed: {e}")
+            count('fallback')
+            plan_data = self._get_fallback_plan(garden_data, str(e))
+            yield from self._plan_sections(plan_data)
+        yield 'done', plan_data
+
+    def _preview_section(self, garden_data, name, value, fragments):
+        """A streamed section with the same corrections _finish_plan applies."""
+        if name == 'optimized_layout' and isinstance(value, dict):
+            return dict(value, crop_distribution=self._crop_distribution(garden_data))
+        if name in ('estimated_yield', 'planting_periods') and fragments:
+            partial = {name: value}
+            self._merge_fragments(partial, fragments)
+            return partial[name]
+        return value
+
+    def _plan_sections(self, plan_data):
+        for name in PLAN_SECTIONS:
+            if name in plan_data:
+                yield 'section', {'name': name, 'value': plan_data[name]}
+
+    def _create_packed_prompt(self, gardens):
+        return packed_prompt(gardens)
+
+    def generate_plans_packed(self, gardens):
+        """Plan several gardens with a single Gemini call.
 
-    def _generate_visualizations(self, garden_data, plan_data):
-        visuals = {}
+        Cached gardens are answered from the cache; any garden missing from
+        the packed answer is planned on its own.
+        """
+        results = [self._cached_plan(g) for g in gardens]
+        pending = [i for i, plan in enumerate(results) if plan is None]
+        if not pending:
+            return results
+
+        plans, fixes = [], ()
         try:
-            # HELPER FUNCTION: This is the important part using 're' 
-            # It turns "60-100kg" into 80.0 so the chart doesn't show 60,000
-            def parse_to_val(val_str):
-                # Find all numbers (including decimals)
-                nums = re.findall(r'\d+\.?\d*', str(val_str))
-                if len(nums) >= 2:
-                    return (float(nums[0]) + float(nums[1])) / 2
-                return float(nums[0]) if nums else 0
-
-            # 1. Pie Chart (Crop Distribution)
-            plt.figure(figsize=(8, 6))
-            dist = plan_data.get('optimized_layout', {}).get('crop_distribution', {})
-            
-            if dist:
-                labels = list(dist.keys())
-                sizes = [parse_to_val(v) for v in dist.values()]
+            print(f"Using Gemini AI (packed, {len(pending)} gardens)...")
+            prompt = self._create_packed_prompt([gardens[i] for i in pending])
+            started = time.perf_counter()
+            response = self.gemini.generate_content(
+                model=self.model_id,
+                contents=prompt,
+                config=self._generation_config()
+            )
+            self._log_call(prompt, started, response)
+            with span('json_parse'):
+                answer, fixes = self.plan_validator.parse(response.text)
+            plans = answer.get('plans', []) if isinstance(answer, dict) else []
+        except Exception as e:
+            print(f"Packed generation failed: {e}")
+
+        for position, i in enumerate(pending):
+            garden_data = gardens[i]
+            if position < len(plans) and isinstance(plans[position], dict):
+                names = [c['name'] for c in garden_data['crops']]
+                plan_data, filled = self._validated_plan(garden_data, plans[position], names, fixes)
+                results[i] = self._finish_plan(garden_data, plan_data, names, {}, filled)
             else:
-                labels = [c['name'] for c in garden_data['crops']]
-                sizes = [c['area'] for c in garden_data['crops']]
-            
-            plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140, colors=['#6A8D53', '#8FB377', '#A9C296', '#D1D9C0'])
-            plt.title("Garden Area Distribution")
-            
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight')
-            visuals['pie_chart'] = base64.b64encode(buf.getvalue()).decode('utf-8')
-            plt.close()
-
-            # 2. Bar Chart (The 60,000kg Fix)
-            plt.figure(figsize=(10, 6))
-            yield_data = plan_data.get('estimated_yield', {})
-            crops = list(yield_data.keys())
-            # We use parse_to_val to get the average of the range
-            yield_vals = [parse_to_val(v) for v in yield_data.values()]
-
-            ax = plt.gca()
-            ax.set_xticks(range(len(crops)))
-            ax.set_xticklabels(crops, rotation=45, ha='right')
-            
-            plt.bar(range(len(crops)), yield_vals, color='#6A8D53')
-            plt.ylabel("Estimated Yield (Average kg)")
-            plt.title("Yield Projections")
-            
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight')
-            visuals['bar_chart'] = base64.b64encode(buf.getvalue()).decode('utf-8')
-            plt.close()
+                results[i] = self.generate_plan(garden_data)
+        return results
 
-        except Exception as e:
-            print(f"Visualization error: {e}")
-            visuals = {'pie_chart': None, 'bar_chart': None}
-            
-        return visuals
+    def _merge_fragments(self, plan_data, fragments):
+        """Fill cached per-crop yields and planting periods into a fresh plan."""
+        if not fragments:
+            return
+        known = {name.strip().lower() for name in fragments}
+        for section in ('estimated_yield', 'planting_periods'):
+            values = plan_data.get(section)
+            if not isinstance(values, dict):
+                values = {}
+            plan_data[section] = {k: v for k, v in values.items() if k.strip().lower() not in known}
+        
+        yields = plan_data['estimated_yield']
+        periods = plan_data['planting_periods']
+        for name, (estimated_yield, planting_period) in fragments.items():
+            yields[name] = estimated_yield
+            if planting_period:
+                periods[name] = planting_period
+
+    def _adapt_cached_plan(self, garden_data, plan_data):
+        """Map a cached plan onto the requester's crop names and exact areas."""
+        names = {c['name'].strip().lower(): c['name'] for c in garden_data['crops']}
+        for section in ('estimated_yield', 'planting_periods'):
+            values = plan_data.get(section)
+            if isinstance(values, dict):
+                plan_data[section] = {names.get(k.strip().lower(), k): v for k, v in values.items()}
+
+        plan_data.setdefault('optimized_layout', {})['crop_distribution'] = self._crop_distribution(garden_data)
+        plan_data['chart_series'] = build_chart_series(garden_data, plan_data)
+        plan_data['from_cache'] = True
+        return plan_data
 
     def _get_fallback_plan(self, data, reason):
-        # Scale yields based on actual garden size
-        garden_size = data.get('garden_size', 100)
-        scale_factor = garden_size / 100
-        
-        yield_estimates = {}
-        for crop in data['crops']:
-            crop_name = crop['name'].lower()
-            if 'carrot' in crop_name or 'beet' in crop_name or 'radish' in crop_name or 'parsnip' in crop_name:
-                yield_estimates[crop['name']] = f"{int(80 * scale_factor)}-{int(120 * scale_factor)} kg"
-            elif 'potato' in crop_name:
-                yield_estimates[crop['name']] = f"{int(80 * scale_factor)}-{int(150 * scale_factor)} kg"
-            elif 'tomato' in crop_name:
-                if data.get('garden_type') == 'greenhouse':
-                    yield_estimates[crop['name']] = f"{int(100 * scale_factor)}-{int(200 * scale_factor)} kg"
-                else:
-                    yield_estimates[crop['name']] = f"{int(50 * scale_factor)}-{int(80 * scale_factor)} kg"
-            elif 'cucumber' in crop_name:
-                if data.get('garden_type') == 'greenhouse':
-                    yield_estimates[crop['name']] = f"{int(80 * scale_factor)}-{int(150 * scale_factor)} kg"
-                else:
-                    yield_estimates[crop['name']] = f"{int(30 * scale_factor)}-{int(50 * scale_factor)} kg"
-            elif 'lettuce' in crop_name or 'spinach' in crop_name or 'kale' in crop_name or 'chard' in crop_name:
-                yield_estimates[crop['name']] = f"{int(15 * scale_factor)}-{int(25 * scale_factor)} kg"
-            elif 'pepper' in crop_name:
-                yield_estimates[crop['name']] = f"{int(30 * scale_factor)}-{int(50 * scale_factor)} kg"
-            elif 'onion' in crop_name or 'garlic' in crop_name or 'leek' in crop_name:
-                yield_estimates[crop['name']] = f"{int(80 * scale_factor)}-{int(120 * scale_factor)} kg"
-            elif 'bean' in crop_name:
-                yield_estimates[crop['name']] = f"{int(30 * scale_factor)}-{int(50 * scale_factor)} kg"
-            elif 'pea' in crop_name:
-                yield_estimates[crop['name']] = f"{int(20 * scale_factor)}-{int(40 * scale_factor)} kg"
-            elif 'cabbage' in crop_name or 'broccoli' in crop_name or 'cauliflower' in crop_name:
-                yield_estimates[crop['name']] = f"{int(80 * scale_factor)}-{int(120 * scale_factor)} kg"
-            elif 'squash' in crop_name or 'zucchini' in crop_name:
-                yield_estimates[crop['name']] = f"{int(50 * scale_factor)}-{int(80 * scale_factor)} kg"
-            else:
-                # Default for unknown crops
-                yield_estimates[crop['name']] = f"{int(30 * scale_factor)}-{int(60 * scale_factor)} kg"
+        # Local planner: yields scaled to each crop's area and real planting
+        # months, straight from the crop knowledge table
+        yield_estimates, planting_periods = estimate_crops(data['crops'], data.get('garden_type'))
         
-        return {
+        plan = {
             "is_fallback": True,
             "optimized_layout": {
                 "crop_distribution": {c['name']: f"{(c['area'] / data['garden_size'] * 100):.1f}%" for c in data['crops']},
@@ -251,7 +347,7 @@ SCALE the yield based on the actual garden size. If garden is 50 sqm, use half o
                 "crop_rotation": "Follow a 4-year rotation: legumes → leafy greens → fruiting crops → root crops"
             },
             "estimated_yield": yield_estimates,
-            "planting_periods": {c['name']: "Plant after last frost, harvest before first frost" for c in data['crops']},
+            "planting_periods": planting_periods,
             "smart_advice": {
                 "irrigation": "Water deeply 2-3 times per week, preferably in the morning.",
                 "soil_management": "Add 2-3 inches of compost before planting. Mulch to retain moisture.",
@@ -262,6 +358,7 @@ SCALE the yield based on the actual garden size. If garden is 50 sqm, use half o
                 "Succession plant lettuce and radishes every 2 weeks for continuous harvest",
                 "Install drip irrigation for water efficiency",
                 "Keep a garden journal to track what works in your specific climate"
-            ],
-            "visualizations": {"pie_chart": None, "bar_chart": None}
-        }
\ No newline at end of file
+            ]
+        }
+        plan["chart_series"] = build_chart_series(data, plan)
+        return plan
\ No newline at end of file
@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from database import db
+from models import GardenPlan, PlanCrop
+
+
+def load_crop_columns(user_id):
+    """All of a user's plan_crop rows as NumPy columns, from a single query."""
+    rows = (db.session.query(
+                PlanCrop.plan_id, PlanCrop.name, PlanCrop.area,
+                PlanCrop.yield_min_kg, PlanCrop.yield_max_kg,
+                GardenPlan.garden_type, GardenPlan.soil_type, GardenPlan.created_at)
+            .join(GardenPlan, GardenPlan.id == PlanCrop.plan_id)
+            .filter(GardenPlan.user_id == user_id)
+            .all())
+    plan_id, name, area, yield_min, yield_max, garden_type, soil_type, created_at = zip(*rows) if rows else ([],) * 8
+    return {
+        'plan_id': np.array(plan_id, dtype=np.int64),
+        'name': np.array(name, dtype=object),
+        'area': np.array(area, dtype=np.float64),
+        # Unknown yields become NaN so they drop out of the sums below
+        'yield_min': np.array([np.nan if v is None else v for v in yield_min], dtype=np.float64),
+        'yield_max': np.array([np.nan if v is None else v for v in yield_max], dtype=np.float64),
+        'garden_type': np.array([v or 'unknown' for v in garden_type], dtype=object),
+        'soil_type': np.array([v or 'unknown' for v in soil_type], dtype=object),
+        'month': np.array([c.strftime('%Y-%m') if c else 'unknown' for c in created_at], dtype=object),
+    }
+
+
+def _group(keys):
+    """(unique keys, index of each row's group) for an object column."""
+    if not len(keys):
+        return np.array([], dtype=object), np.array([], dtype=np.int64)
+    return np.unique(keys.astype(str), return_inverse=True)
+
+
+def _sums(groups, weights, size):
+    return np.bincount(groups, weights=np.nan_to_num(weights), minlength=size)
+
+
+def _distinct_plans(groups, plan_ids, size):
+    """Number of different plans in each group."""
+    # Pack (group, plan) into one integer so a flat unique finds the distinct pairs
+    _, plan_index = np.unique(plan_ids, return_inverse=True)
+    width = plan_index.max() + 1
+    pairs = np.unique(groups.astype(np.int64) * width + plan_index)
+    return np.bincount(pairs // width, minlength=size)
+
+
+def _yield_per_sqm(columns, key):
+    """Mean yield per square metre by a plan attribute, over crops with a known yield."""
+    known = ~np.isnan(columns['yield_min'])
+    labels, groups = _group(columns[key][known])
+    if not len(labels):
+        return []
+    area = _sums(groups, columns['area'][known], len(labels))
+    midpoint = _sums(groups, (columns['yield_min'][known] + columns['yield_max'][known]) / 2, len(labels))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_sqm = np.where(area > 0, midpoint / area, 0.0)
+    return [
+        {key: str(label), 'area': round(float(a), 2), 'kg_per_sqm': round(float(v), 2)}
+        for label, a, v in zip(labels, area, per_sqm)
+    ]
+
+
+def compute_dashboard(columns):
+    """Totals, per-crop sums, yield per sqm and monthly trends for one user."""
+    area = columns['area']
+    yield_min, yield_max = columns['yield_min'], columns['yield_max']
+
+    # Crops are grouped case-insensitively; the first spelling seen is shown
+    crop_keys, crop_groups = _group(np.char.lower(np.char.strip(columns['name'].astype(str))))
+    size = len(crop_keys)
+    crops = []
+    if size:
+        first_row = np.full(size, len(crop_groups))
+        np.minimum.at(first_row, crop_groups, np.arange(len(crop_groups)))
+        crop_area = _sums(crop_groups, area, size)
+        crop_min, crop_max = _sums(crop_groups, yield_min, size), _sums(crop_groups, yield_max, size)
+        with_yield = np.bincount(crop_groups, weights=~np.isnan(yield_min), minlength=size)
+        plans_per_crop = _distinct_plans(crop_groups, columns['plan_id'], size)
+        for g in np.argsort(-crop_area, kind='stable'):
+            crops.append({
+                'name': str(columns['name'][first_row[g]]),
+                'plans': int(plans_per_crop[g]),
+                'area': round(float(crop_area[g]), 2),
+                'yield_min_kg': round(float(crop_min[g]), 1) if with_yield[g] else None,
+                'yield_max_kg': round(float(crop_max[g]), 1) if with_yield[g] else None,
+            })
+
+    months, month_groups = _group(columns['month'])
+    trends = []
+    if len(months):
+        month_area = _sums(month_groups, area, len(months))
+        month_yield = _sums(month_groups, (yield_min + yield_max) / 2, len(months))
+        month_plans = _distinct_plans(month_groups, columns['plan_id'], len(months))
+        for m, label in enumerate(months):
+            trends.append({
+                'month': str(label),
+                'plans': int(month_plans[m]),
+                'area': round(float(month_area[m]), 2),
+                'yield_kg': round(float(month_yield[m]), 1),
+            })
+
+    return {
+        'totals': {
+            'plans': int(len(np.unique(columns['plan_id']))),
+            'crops': int(len(crop_keys)),
+            'area': round(float(area.sum()), 2),
+            'yield_min_kg': round(float(np.nansum(yield_min)), 1),
+            'yield_max_kg': round(float(np.nansum(yield_max)), 1),
+        },
+        'crops': crops,
+        'by_garden_type': _yield_per_sqm(columns, 'garden_type'),
+        'by_soil_type': _yield_per_sqm(columns, 'soil_type'),
+        'trends': trends,
+    }
+
+
+class DashboardCache:
+    """Per-user dashboard results, bounded LRU.
+
+    Routes call invalidate() when they add or delete a plan. Each hit also
+    compares a cheap (plan count, newest plan id) fingerprint, so plans
+    written by background jobs or other workers are picked up too.
+    """
+
+    def __init__(self, max_users=256):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, user_id):
+        count, newest = (db.session.query(db.func.count(GardenPlan.id), db.func.max(GardenPlan.id))
+                         .filter(GardenPlan.user_id == user_id).one())
+        return count, newest
+
+    def get(self, user_id):
+        fingerprint = self._fingerprint(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        dashboard = compute_dashboard(load_crop_columns(user_id))
+        with self._lock:
+            self._entries[user_id] = (fingerprint, dashboard)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return dashboard
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
@@ -1,55 +1,133 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort, stream_with_context, send_file, current_app
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.local import LocalProxy
 import json
+import math
 import os
 import sys
 import traceback
 import re  
+import secrets
 from datetime import datetime
 
 from config import Config
-from database import db
-from models import User, GardenPlan
-from ai_generator import GardenAIGenerator
-
-# Initialize app
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Initialize extensions
-db.init_app(app)
+from database import db, init_database
+from models import User, GardenPlan, PlanJob, PlanCrop
+from job_queue import QueueFullError
+from chart_store import HASH_RE
+from charts import CHART_KINDS
+from migrations import upgrade_schema, move_plan_charts
+from plan_stream import sse, PLAN_SECTIONS
+from metrics import REGISTRY, span, count
+from profiler import RequestProfiler, list_profiles, profile_path, profile_report
+from password_utils import HasherBusyError
+from services import GardenServices, preload_modules
 
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# Initialize AI generator
-ai_generator = GardenAIGenerator()
+# The current app's components, built on first use (see services.py)
+def services():
+    return current_app.extensions['garden']
+
+ai_generator = LocalProxy(lambda: services().ai_generator)
+chart_store = LocalProxy(lambda: services().chart_store)
+chart_renders = LocalProxy(lambda: services().chart_renders)
+plan_jobs = LocalProxy(lambda: services().plan_jobs)
+dashboards = LocalProxy(lambda: services().dashboards)
+batch_planner = LocalProxy(lambda: services().batch_planner)
+user_cache = LocalProxy(lambda: services().user_cache)
+password_hasher = LocalProxy(lambda: services().password_hasher)
+
+# Views are collected here and added to each app by create_app
+_routes = []
+
+def route(rule, **options):
+    def register(view):
+        _routes.append((rule, view, options))
+        return view
+    return register
+
+def create_app(config=Config):
+    """Build the Flask app. Cheap: no database access and no Gemini client
+    until a request needs one; run "flask --app app init-db" to create the schema."""
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    # Not installed at all unless enabled, so normal requests pay nothing
+    if app.config['PROFILER_ENABLED']:
+        app.wsgi_app = RequestProfiler(
+            app.wsgi_app, app.config['PROFILE_DIR'],
+            sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+            token=app.config['PROFILE_TOKEN'],
+            keep=app.config['PROFILE_KEEP']
+        )
+
+    init_database(app)
+    login_manager.init_app(app)
+
+    garden = app.extensions['garden'] = GardenServices(app)
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    app.add_template_global(chart_url)
+    app.register_error_handler(HasherBusyError, hasher_busy)
+    app.cli.command('init-db')(init_db)
+
+    # Component stats dicts, read when /metrics is scraped; a scrape builds nothing
+    def component_stats(name, part=None):
+        def source():
+            component = garden.peek(name)
+            if part is not None:
+                component = getattr(component, part, None)
+            return component.stats if component is not None else None
+        return source
+    REGISTRY.register_stats('garden_gemini_total', 'Gemini calls, retries and errors',
+                            component_stats('ai_generator', 'gemini'))
+    REGISTRY.register_stats('garden_plan_cache_total', 'Plan cache hits, misses and stores',
+                            component_stats('ai_generator', 'plan_cache'))
+    REGISTRY.register_stats('garden_chart_cache_total', 'Chart render cache hits and renders',
+                            component_stats('chart_renders'))
+    REGISTRY.register_stats('garden_plan_validation_total', 'Gemini answers by validation outcome',
+                            component_stats('ai_generator', 'plan_validator'))
+    REGISTRY.register_stats('garden_user_cache_total', 'User loader cache hits and misses',
+                            component_stats('user_cache'))
+    REGISTRY.register_stats('garden_password_hash_total', 'Password hashes, checks, rehashes and 503s',
+                            component_stats('password_hasher'))
+
+    if app.config['PRELOAD_MODULES']:
+        preload_modules(app.config['CHART_RENDERER'])
+    return app
+
+def __getattr__(name):
+    # "gunicorn app:app" and "flask run" from before create_app(): build one
+    # app on first access, so importing this module alone still builds nothing
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    if current_app.config['USER_CACHE_TTL'] <= 0:
+        return User.query.get(int(user_id))
+    return user_cache.get(int(user_id))
 
 def init_db():
-    with app.app_context():
-        data_dir = os.path.join(app.config['BASE_DIR'], 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        db.create_all()
-        print("Database initialized successfully!")
-
-try:
-    init_db()
-except Exception as e:
-    print(f"Error initializing database: {e}")
+    """Create the data directory, the tables and any missing columns."""
+    data_dir = os.path.join(current_app.config['BASE_DIR'], 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    db.create_all()
+    upgrade_schema()
+    print("Database initialized successfully!")
 
 # --- ROUTES ---
 
-@app.route('/')
+@route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
         return redirect(url_for('account'))
@@ -97,7 +175,7 @@ def register():
         new_user = User(
             username=username, 
             email=email, 
-            password_hash=generate_password_hash(password)
+            password_hash=password_hasher.hash(password)
         )
         try:
             db.session.add(new_user)
@@ -117,7 +195,7 @@ def register():
 
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('account'))
@@ -128,10 +206,18 @@ def login():
         
         user = User.query.filter_by(username=username).first()
         
-        if not user or not check_password_hash(user.password_hash, password):
+        if not user or not password_hasher.check(user.password_hash, password):
             flash('Invalid username or password')
             return redirect(url_for('login'))
         
+        # Hash made with an older method or cost: redo it now that we have the password
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = password_hasher.rehash(password)
+                db.session.commit()
+            except HasherBusyError:
+                pass  # next login
+        
         # ✅ NO EMAIL VERIFICATION CHECK - just login
         login_user(user)
         
@@ -145,22 +231,41 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/logout')
+@route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
     # 🔴 ADD THIS - Clear all flash messages and session data
     session.clear()
     flash('You have been logged out successfully.')
     return redirect(url_for('index'))
 
-@app.route('/account')
+@route('/account')
 @login_required
 def account():
-    saved_plans = GardenPlan.query.filter_by(user_id=current_user.id).all()
-    return render_template('account.html', user=current_user, plans=[p.to_dict() for p in saved_plans])
+    plans, next_cursor = GardenPlan.summaries_for_user(current_user.id, limit=current_app.config['PLANS_PAGE_SIZE'])
+    return render_template('account.html', user=current_user, plans=plans, next_cursor=next_cursor)
+
+@route('/api/plans')
+@login_required
+def list_plans():
+    """JSON pages of the account listing: ?cursor=<next_cursor>&limit=N."""
+    try:
+        config = current_app.config
+        limit = min(int(request.args.get('limit', config['PLANS_PAGE_SIZE'])), config['PLANS_PAGE_MAX'])
+        plans, next_cursor = GardenPlan.summaries_for_user(
+            current_user.id, cursor=request.args.get('cursor'), limit=limit
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    
+    for plan in plans:
+        plan['url'] = url_for('view_plan', plan_id=plan['id'])
+        plan['delete_url'] = url_for('delete_plan', plan_id=plan['id'])
+    return jsonify({'plans': plans, 'next_cursor': next_cursor})
 
-@app.route('/change-password', methods=['POST'])
+@route('/change-password', methods=['POST'])
 @login_required
 def change_password():
     current_password = request.form.get('current_password', '')
@@ -169,8 +274,11 @@ def change_password():
     
     from password_utils import validate_password_strength
     
+    # current_user is a cached snapshot without the hash
+    user = db.session.get(User, current_user.id)
+    
     # Verify current password
-    if not check_password_hash(current_user.password_hash, current_password):
+    if not password_hasher.check(user.password_hash, current_password):
         flash('Current password is incorrect')
         return redirect(url_for('account'))
     
@@ -187,14 +295,15 @@ def change_password():
         return redirect(url_for('account'))
     
     # Update password
-    current_user.password_hash = generate_password_hash(new_password)
+    user.password_hash = password_hasher.hash(new_password)
     db.session.commit()
+    user_cache.invalidate(user.id)
     
     flash('Password updated successfully!')
     return redirect(url_for('account'))
 
 # Password Reset Routes
-@app.route('/reset-password-request', methods=['GET', 'POST'])
+@route('/reset-password-request', methods=['GET', 'POST'])
 def reset_password_request():
     if request.method == 'POST':
         email = request.form.get('email')
@@ -210,7 +319,7 @@ def reset_password_request():
     
     return render_template('reset_password_request.html')
 
-@app.route('/reset-password/<token>', methods=['GET', 'POST'])
+@route('/reset-password/<token>', methods=['GET', 'POST'])
 def reset_password(token):
     email = confirm_token(token)
     if not email:
@@ -231,124 +340,456 @@ def reset_password(token):
             flash('Password must be at least 8 characters')
             return redirect(url_for('reset_password', token=token))
         
-        user.password_hash = generate_password_hash(password)
+        user.password_hash = password_hasher.hash(password)
         db.session.commit()
+        user_cache.invalidate(user.id)
         
         flash('Your password has been updated! You can now login.')
         return redirect(url_for('login'))
     
     return render_template('reset_password.html', token=token)
 
+def parse_garden_form(form):
+    """Build garden_data from the plan form; raises ValueError with a user-facing message."""
+    garden_data = {
+        'location': form.get('location', 'Global'),
+        'garden_type': form.get('garden_type', 'open_ground'),
+        'garden_size': float(form.get('garden_size', 10)),
+        'soil_type': form.get('soil_type', 'loamy'),
+        'sunlight': form.get('sunlight', 'full_sun'),
+        'watering_frequency': form.get('watering_frequency', '2_3_times'),
+        'main_goal': form.get('main_goal', 'consumption'),
+        'pest_prevention': form.get('pest_prevention') == 'yes',
+        'crops': []
+    }
+    
+    names, areas = form.getlist('crop_name[]'), form.getlist('crop_area[]')
+    
+    for n, a in zip(names, areas):
+        if n and a: 
+            garden_data['crops'].append({'name': n.strip(), 'area': float(a)})
+    
+    return check_garden_data(garden_data)
+
+def check_garden_data(garden_data):
+    """Validation shared by the plan form and the batch API."""
+    if not garden_data['crops']:
+        raise ValueError('Please add at least one crop')
+    
+    max_crops = current_app.config['MAX_CROPS']
+    if len(garden_data['crops']) > max_crops:
+        raise ValueError(f'A garden can have at most {max_crops} crops')
+    
+    # 🔴 VALIDATION - Only show error, no warning
+    garden_size = garden_data['garden_size']
+    total_crop_area = sum(c['area'] for c in garden_data['crops'])
+    
+    # float() accepts "nan" and "inf", which every comparison here would let through
+    sizes = [garden_size] + [c['area'] for c in garden_data['crops']]
+    if not all(math.isfinite(size) and size > 0 for size in sizes):
+        raise ValueError('Garden size and crop areas must be positive')
+    
+    if total_crop_area > garden_size:
+        raise ValueError(f'❌ Total crop area ({total_crop_area:.1f} sqm) exceeds your garden size ({garden_size:.1f} sqm). Please reduce crop areas or increase garden size.')
+    
+    return garden_data
+
+def parse_garden_spec(spec):
+    """Build garden_data from one JSON garden spec (same fields as the form)."""
+    if not isinstance(spec, dict):
+        raise ValueError('Each garden must be a JSON object')
+    
+    crops = spec.get('crops')
+    if not isinstance(crops, list):
+        raise ValueError('crops must be a list of {"name", "area"} objects')
+    
+    garden_data = {
+        'location': str(spec.get('location', 'Global')),
+        'garden_type': str(spec.get('garden_type', 'open_ground')),
+        'garden_size': float(spec.get('garden_size', 10)),
+        'soil_type': str(spec.get('soil_type', 'loamy')),
+        'sunlight': str(spec.get('sunlight', 'full_sun')),
+        'watering_frequency': str(spec.get('watering_frequency', '2_3_times')),
+        'main_goal': str(spec.get('main_goal', 'consumption')),
+        'pest_prevention': spec.get('pest_prevention') in (True, 'yes'),
+        'crops': []
+    }
+    for crop in crops:
+        if not isinstance(crop, dict) or not str(crop.get('name', '')).strip():
+            raise ValueError('Every crop needs a name and an area')
+        garden_data['crops'].append({'name': str(crop['name']).strip(), 'area': float(crop.get('area', 0))})
+    
+    return check_garden_data(garden_data)
+
+def hasher_busy(e):
+    # Shed the sign-in rather than queue it behind the others
+    if wants_json():
+        response = jsonify({'error': str(e)})
+    else:
+        response = current_app.make_response(render_template('error.html', message=f'{e}. Please try again in a moment.'))
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
 # Create Plan Route (updated to check verification)
-@app.route('/create-plan', methods=['GET', 'POST'])
+@route('/create-plan', methods=['GET', 'POST'])
 @login_required
 def create_plan():
     
-    # ... rest of your existing create_plan code ...
     if request.method == 'POST':
         try:
-            # 1. Collect form data
-            garden_data = {
-                'location': request.form.get('location', 'Global'),
-                'garden_type': request.form.get('garden_type', 'open_ground'),
-                'garden_size': float(request.form.get('garden_size', 10)),
-                'soil_type': request.form.get('soil_type', 'loamy'),
-                'sunlight': request.form.get('sunlight', 'full_sun'),
-                'watering_frequency': request.form.get('watering_frequency', '2_3_times'),
-                'main_goal': request.form.get('main_goal', 'consumption'),
-                'pest_prevention': request.form.get('pest_prevention') == 'yes',
-                'crops': []
-            }
-            
-            # 2. Process crops
-            names, areas = request.form.getlist('crop_name[]'), request.form.getlist('crop_area[]')
-            total_crop_area = 0
-            
-            for n, a in zip(names, areas):
-                if n and a: 
-                    area = float(a)
-                    total_crop_area += area
-                    garden_data['crops'].append({'name': n.strip(), 'area': area})
-            
-            if not garden_data['crops']:
-                flash('Please add at least one crop')
+            # 1. Collect and validate form data
+            try:
+                with span('form_parse'):
+                    garden_data = parse_garden_form(request.form)
+            except ValueError as e:
+                if wants_json():
+                    return jsonify({'error': str(e)}), 400
+                flash(str(e))
                 return redirect(url_for('create_plan'))
             
-            # 🔴 VALIDATION - Only show error, no warning
-            garden_size = garden_data['garden_size']
+            # 2. Job mode: hand off to the background pool and return right away
+            if current_app.config['PLAN_JOBS_ENABLED'] or request.form.get('mode') == 'job':
+                try:
+                    job_id = plan_jobs.submit(current_user.id, garden_data)
+                except QueueFullError as e:
+                    if wants_json():
+                        return jsonify({'error': str(e)}), 503
+                    flash(f'{e}. Please try again in a minute.')
+                    return redirect(url_for('create_plan'))
+                
+                if wants_json():
+                    return jsonify({
+                        'job_id': job_id,
+                        'status_url': url_for('plan_job_status', job_id=job_id)
+                    }), 202
+                return redirect(url_for('plan_job', job_id=job_id))
             
-            if total_crop_area > garden_size:
-                flash(f'❌ Total crop area ({total_crop_area:.1f} sqm) exceeds your garden size ({garden_size:.1f} sqm). Please reduce crop areas or increase garden size.')
-                return redirect(url_for('create_plan'))
-            # ✅ REMOVED the unused space warning completely
+            # 3. Streaming mode: open the result page now and stream the plan into it
+            if current_app.config['PLAN_STREAMING_ENABLED'] or request.form.get('mode') == 'stream':
+                stream_id = secrets.token_urlsafe(16)
+                # Kept in the (signed cookie) session so any worker can serve the stream
+                pending = session.get('plan_streams', []) + [[stream_id, garden_data]]
+                session['plan_streams'] = pending[-current_app.config['PLAN_STREAMS_PER_USER']:]
+                return render_template('plan_result.html', plan=None, garden_data=garden_data,
+                                       ai_plan={name: {} for name in PLAN_SECTIONS},
+                                       stream_url=url_for('create_plan_stream', stream_id=stream_id))
             
-            # 3. Generate AI plan with Retry Logic
-            ai_plan = ai_generator.generate_plan(garden_data)
+            # 4. Generate AI plan with Retry Logic
+            with span('generate_plan'):
+                ai_plan = ai_generator.generate_plan(garden_data)
             
             if ai_plan.get('is_fallback'):
                 flash("The AI service is busy. Showing a standard global plan for now.", "info")
             
-            # 4. Save to Database
-            new_plan = GardenPlan(
-                plan_name=f"Plan for {garden_data['location']}",
-                user_id=current_user.id,
-                location=garden_data['location'],
-                garden_type=garden_data['garden_type'],
-                garden_size=garden_data['garden_size'],
-                soil_type=garden_data['soil_type'],
-                sunlight=garden_data['sunlight'],
-                watering_frequency=garden_data['watering_frequency'],
-                main_goal=garden_data['main_goal'],
-                pest_prevention=garden_data['pest_prevention'],
-                crop_data=json.dumps(garden_data['crops']),
-                optimized_layout=json.dumps(ai_plan.get('optimized_layout', {})),
-                estimated_yield=json.dumps(ai_plan.get('estimated_yield', {})),
-                planting_periods=json.dumps(ai_plan.get('planting_periods', {})),
-                smart_advice=json.dumps(ai_plan.get('smart_advice', {})),
-                pie_chart_image=ai_plan.get('visualizations', {}).get('pie_chart'),
-                bar_chart_image=ai_plan.get('visualizations', {}).get('bar_chart')
-            )
+            # 5. Save to Database
+            new_plan = GardenPlan.from_generated(current_user.id, garden_data, ai_plan)
             
             db.session.add(new_plan)
-            db.session.commit()
+            with span('db_commit'):
+                db.session.commit()
+            dashboards.invalidate(current_user.id)
             
             return render_template('plan_result.html', plan=new_plan, garden_data=garden_data, ai_plan=ai_plan)
 
         except Exception as e:
             db.session.rollback()
+            count('request_error')
             print(traceback.format_exc())
             flash(f'Error: {str(e)}')
             return redirect(url_for('create_plan'))
     
-    return render_template('plan_form.html', max_crops=Config.MAX_CROPS)
+    return render_template('plan_form.html', max_crops=current_app.config['MAX_CROPS'])
+
+@route('/create-plan/stream/<stream_id>')
+@login_required
+def create_plan_stream(stream_id):
+    """Server-Sent Events for a plan started in streaming mode.
+
+    Sends a "section" event as each part of the plan is generated, then
+    saves the GardenPlan and sends "saved" with its URLs.
+    """
+    pending = session.get('plan_streams', [])
+    garden_data = next((data for key, data in pending if key == stream_id), None)
+    if garden_data is None:
+        # 204 tells EventSource to stop reconnecting
+        return '', 204
+    session['plan_streams'] = [item for item in pending if item[0] != stream_id]
+    user_id = current_user.id
+    
+    def events():
+        ai_plan = None
+        for event, payload in ai_generator.stream_plan(garden_data):
+            if event == 'done':
+                ai_plan = payload
+            else:
+                yield sse(event, payload)
+        
+        new_plan = GardenPlan.from_generated(user_id, garden_data, ai_plan)
+        try:
+            db.session.add(new_plan)
+            with span('db_commit'):
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            count('request_error')
+            print(traceback.format_exc())
+            yield sse('error', {'error': 'Could not save plan'})
+            return
+        dashboards.invalidate(user_id)
+        
+        # Final values replace the previews (e.g. yields merged from cached fragments)
+        yield sse('saved', {
+            'plan_id': new_plan.id,
+            'plan_url': url_for('view_plan', plan_id=new_plan.id),
+            'is_fallback': bool(ai_plan.get('is_fallback')),
+            'sections': {name: ai_plan[name] for name in PLAN_SECTIONS if name in ai_plan},
+            'charts': {kind: chart_url(new_plan, kind) for kind in CHART_KINDS}
+        })
+    
+    response = current_app.response_class(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@route('/api/plans/batch', methods=['POST'])
+@login_required
+def create_plans_batch():
+    """Plan many gardens at once.
+
+    Body: {"gardens": [garden spec, ...], "pack": false}. Every spec is
+    validated before any generation starts; all plans are saved in one
+    transaction and the response has one result or error per input item.
+    """
+    payload = request.get_json(silent=True) or {}
+    specs = payload.get('gardens')
+    if not isinstance(specs, list) or not specs:
+        return jsonify({'error': 'gardens must be a non-empty list'}), 400
+    max_items = current_app.config['BATCH_MAX_ITEMS']
+    if len(specs) > max_items:
+        return jsonify({'error': f'At most {max_items} gardens per batch'}), 400
+    
+    results = [None] * len(specs)
+    valid = []
+    for i, spec in enumerate(specs):
+        try:
+            valid.append((i, parse_garden_spec(spec)))
+        except (ValueError, TypeError) as e:
+            results[i] = {'index': i, 'error': str(e)}
+    
+    with span('generate_batch'):
+        ai_plans = batch_planner.plan([g for _, g in valid], pack=bool(payload.get('pack')))
+    
+    rows = []
+    for (i, garden_data), ai_plan in zip(valid, ai_plans):
+        if isinstance(ai_plan, Exception):
+            results[i] = {'index': i, 'error': str(ai_plan)}
+        else:
+            rows.append((i, GardenPlan.from_generated(current_user.id, garden_data, ai_plan), ai_plan))
+    
+    try:
+        db.session.add_all([row for _, row, _ in rows])
+        with span('db_commit'):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        count('request_error')
+        print(traceback.format_exc())
+        for i, _, _ in rows:
+            results[i] = {'index': i, 'error': 'Could not save plan'}
+    else:
+        dashboards.invalidate(current_user.id)
+        for i, row, ai_plan in rows:
+            results[i] = {
+                'index': i,
+                'plan_id': row.id,
+                'plan_url': url_for('view_plan', plan_id=row.id),
+                'is_fallback': bool(ai_plan.get('is_fallback'))
+            }
+    
+    return jsonify({'results': results})
+
+@route('/metrics')
+def metrics():
+    """Stage latencies and counters for Prometheus (this process only)."""
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not secrets.compare_digest(supplied, f'Bearer {token}'):
+            abort(401)
+    return current_app.response_class(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def admin_only():
+    # 404 rather than 403 so the admin pages don't advertise themselves
+    if current_user.username not in current_app.config['ADMIN_USERS']:
+        abort(404)
+
+@route('/admin/profiles')
+@login_required
+def admin_profiles():
+    admin_only()
+    return render_template('profiles.html', profiles=list_profiles(current_app.config['PROFILE_DIR']),
+                           enabled=current_app.config['PROFILER_ENABLED'])
+
+@route('/admin/profiles/<name>')
+@login_required
+def admin_profile(name):
+    admin_only()
+    try:
+        path = profile_path(current_app.config['PROFILE_DIR'], name)
+    except ValueError:
+        abort(404)
+    if not os.path.exists(path):
+        abort(404)
+    if request.args.get('download'):
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'ncalls'):
+        abort(400)
+    return current_app.response_class(profile_report(path, sort), content_type='text/plain; charset=utf-8')
+
+@route('/dashboard')
+@login_required
+def dashboard():
+    return render_template('dashboard.html', stats=dashboards.get(current_user.id))
+
+@route('/api/dashboard')
+@login_required
+def dashboard_data():
+    return jsonify(dashboards.get(current_user.id))
+
+@route('/api/crops/totals')
+@login_required
+def crop_totals():
+    """Planted area and expected yield per crop over all of the user's plans."""
+    return jsonify({'crops': PlanCrop.totals_for_user(current_user.id)})
+
+def _get_own_job(job_id):
+    job = PlanJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        abort(404)
+    return job
+
+@route('/plan-jobs/<job_id>')
+@login_required
+def plan_job(job_id):
+    job = _get_own_job(job_id)
+    
+    if job.status == 'done':
+        if job.is_fallback:
+            flash("The AI service is busy. Showing a standard global plan for now.", "info")
+        return redirect(url_for('view_plan', plan_id=job.plan_id))
+    
+    if job.status == 'failed':
+        flash(f'Error: {job.error}')
+        return redirect(url_for('create_plan'))
+    
+    return render_template('plan_job.html', job=job)
+
+@route('/plan-jobs/<job_id>/status')
+@login_required
+def plan_job_status(job_id):
+    job = _get_own_job(job_id)
+    result = job.to_dict()
+    if job.status == 'done':
+        result['plan_url'] = url_for('view_plan', plan_id=job.plan_id)
+    return jsonify(result)
 
 # View Plan (no changes needed)
-@app.route('/plan/<int:plan_id>')
+@route('/plan/<int:plan_id>')
 @login_required
 def view_plan(plan_id):
-    plan = GardenPlan.query.get_or_404(plan_id)
+    plan = GardenPlan.query.options(db.undefer_group('details')).get_or_404(plan_id)
     if plan.user_id != current_user.id:
         return redirect(url_for('account'))
     
+    # Rows saved before the chart store still carry base64 images; move them on first view
+    if plan.pie_chart_hash is None and plan.bar_chart_hash is None and (plan.pie_chart_image or plan.bar_chart_image):
+        move_plan_charts(plan, chart_store)
+        db.session.commit()
+    
     garden_data = {'crops': json.loads(plan.crop_data or '[]'), 'location': plan.location}
     ai_plan = {
         'optimized_layout': json.loads(plan.optimized_layout or '{}'),
         'estimated_yield': json.loads(plan.estimated_yield or '{}'),
         'planting_periods': json.loads(plan.planting_periods or '{}'),
-        'smart_advice': json.loads(plan.smart_advice or '{}'),
-        'visualizations': {'pie_chart': plan.pie_chart_image, 'bar_chart': plan.bar_chart_image}
+        'smart_advice': json.loads(plan.smart_advice or '{}')
     }
     return render_template('plan_result.html', plan=plan, garden_data=garden_data, ai_plan=ai_plan)
 
-@app.route('/delete-plan/<int:plan_id>')
+def chart_url(plan, kind):
+    """URL of a plan chart: rendered from its series, or a stored legacy PNG."""
+    if plan.chart_series:
+        series = json.loads(plan.chart_series)
+        # v changes with the data or renderer version, so the URL can be cached forever
+        return url_for('plan_chart', plan_id=plan.id, kind=kind, ext=chart_renders.extension,
+                       v=chart_renders.key(kind, series))
+    chart_hash = plan.pie_chart_hash if kind == 'pie' else plan.bar_chart_hash
+    return url_for('chart', chart_hash=chart_hash) if chart_hash else None
+
+@route('/plan/<int:plan_id>/chart/<kind>.<ext>')
+@login_required
+def plan_chart(plan_id, kind, ext):
+    if kind not in CHART_KINDS or ext != chart_renders.extension:
+        abort(404)
+    row = (db.session.query(GardenPlan.user_id, GardenPlan.chart_series)
+           .filter(GardenPlan.id == plan_id).first())
+    if row is None or row.user_id != current_user.id or not row.chart_series:
+        abort(404)
+    
+    series = json.loads(row.chart_series)
+    etag = chart_renders.key(kind, series)
+    if etag in request.if_none_match:
+        # The browser already has this render; skip drawing it
+        response = current_app.response_class(status=304)
+    else:
+        data, mimetype = chart_renders.render_with_fallback(kind, series)
+        response = current_app.response_class(data, mimetype=mimetype)
+        if mimetype != chart_renders.mimetype:
+            # Stand-in after a failed render: let the browser ask again next time
+            response.cache_control.no_store = True
+            return response
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response
+
+@route('/chart/<chart_hash>.png')
+def chart(chart_hash):
+    # Content-addressed: the URL changes whenever the bytes do, so cache forever
+    if not HASH_RE.match(chart_hash):
+        abort(404)
+    data = chart_store.get(chart_hash)
+    if data is None:
+        abort(404)
+    
+    response = current_app.response_class(data, mimetype='image/png')
+    response.set_etag(chart_hash)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+@route('/delete-plan/<int:plan_id>')
 @login_required
 def delete_plan(plan_id):
     plan = GardenPlan.query.get_or_404(plan_id)
     if plan.user_id == current_user.id:
         db.session.delete(plan)
         db.session.commit()
+        dashboards.invalidate(current_user.id)
         flash('Plan deleted.')
     return redirect(url_for('account'))
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_db()
     app.run(debug=True, port=5000)
\ No newline at end of file
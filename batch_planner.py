@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from plan_cache import canonical_garden_key
+
+
+class BatchPlanner:
+    """Fans a list of validated gardens out to the generator.
+
+    Identical gardens are generated once, at most max_concurrency Gemini
+    calls run at a time, and with pack=True small gardens (up to
+    pack_max_crops crops) are sent pack_size at a time in one prompt.
+    """
+
+    def __init__(self, generator, max_concurrency=4, pack_size=4, pack_max_crops=4):
+        self.generator = generator
+        self.max_concurrency = max_concurrency
+        self.pack_size = pack_size
+        self.pack_max_crops = pack_max_crops
+
+    def plan(self, gardens, pack=False):
+        """Return one ai_plan (or the Exception that stopped it) per garden."""
+        unique = {}
+        for garden_data in gardens:
+            unique.setdefault(canonical_garden_key(garden_data), garden_data)
+        keys = list(unique)
+
+        groups = []
+        if pack and self.pack_size > 1:
+            small = [k for k in keys if len(unique[k]['crops']) <= self.pack_max_crops]
+            groups = [small[i:i + self.pack_size] for i in range(0, len(small), self.pack_size)]
+            packed = set(small)
+            groups += [[k] for k in keys if k not in packed]
+        else:
+            groups = [[k] for k in keys]
+
+        plans = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [(group, executor.submit(self._run_group, [unique[k] for k in group])) for group in groups]
+            for group, future in futures:
+                try:
+                    for key, ai_plan in zip(group, future.result()):
+                        plans[key] = ai_plan
+                except Exception as e:
+                    for key in group:
+                        plans[key] = e
+
+        return [plans[canonical_garden_key(g)] for g in gardens]
+
+    def _run_group(self, group):
+        if len(group) == 1:
+            return [self.generator.generate_plan(group[0])]
+        return self.generator.generate_plans_packed(group)
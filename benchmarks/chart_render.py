@@ -0,0 +1,97 @@
+"""Compare the matplotlib and SVG chart renderers.
+
+Each renderer runs in its own subprocess so import time and peak RSS are
+not polluted by the other one:
+
+    python benchmarks/chart_render.py --runs 50 --crops 6
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import resource
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def sample_series(crop_count):
+    names = ['Tomato', 'Carrot', 'Potato', 'Lettuce', 'Cucumber', 'Pepper', 'Onion', 'Beans',
+             'Cabbage', 'Zucchini', 'Garlic', 'Spinach']
+    names = [names[i % len(names)] + ('' if i < len(names) else f' {i}') for i in range(crop_count)]
+    return {
+        'pie': {'labels': names, 'values': [round(100 / crop_count, 1)] * crop_count},
+        'bar': {'labels': names, 'values': [12.5 + 7 * i for i in range(crop_count)]},
+    }
+
+
+def max_rss_kb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_child(renderer, runs, crops):
+    baseline_rss = max_rss_kb()
+    started = time.perf_counter()
+    from charts import RENDERERS
+    _, _, functions = RENDERERS[renderer]
+    series = sample_series(crops)
+
+    # The first render pays for lazy imports (fonts, pyplot) on cold workers
+    first = time.perf_counter()
+    outputs = {kind: functions[kind](series[kind]) for kind in ('pie', 'bar')}
+    cold_ms = (time.perf_counter() - first) * 1000
+    import_ms = (first - started) * 1000
+
+    timings = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        for kind in ('pie', 'bar'):
+            functions[kind](series[kind])
+        timings.append((time.perf_counter() - t) * 1000)
+
+    return {
+        'renderer': renderer,
+        'import_ms': round(import_ms, 1),
+        'cold_render_ms': round(cold_ms, 1),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'p95_ms': round(sorted(timings)[int(len(timings) * 0.95) - 1], 2),
+        'bytes': sum(len(v) for v in outputs.values()),
+        'gzip_bytes': sum(len(gzip.compress(v)) for v in outputs.values()),
+        'peak_rss_mb': round(max_rss_kb() / 1024, 1),
+        'rss_growth_mb': round((max_rss_kb() - baseline_rss) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=30, help='renders of both charts per renderer')
+    parser.add_argument('--crops', type=int, default=6, help='crops in the sample plan')
+    parser.add_argument('--renderers', default='matplotlib,svg')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.runs, args.crops)))
+        return
+
+    results = []
+    for renderer in args.renderers.split(','):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', renderer, '--runs', str(args.runs), '--crops', str(args.crops)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    columns = ['renderer', 'import_ms', 'cold_render_ms', 'mean_ms', 'p95_ms', 'bytes', 'gzip_bytes', 'peak_rss_mb', 'rss_growth_mb']
+    print("  ".join(f"{c:>14}" for c in columns))
+    for result in results:
+        print("  ".join(f"{str(result[c]):>14}" for c in columns))
+
+
+if __name__ == '__main__':
+    main()
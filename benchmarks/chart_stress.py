@@ -0,0 +1,100 @@
+"""Render matplotlib charts from many threads at once and check the output.
+
+Every series gets a reference PNG rendered serially first. The same
+series are then rendered concurrently (in-thread, and through the process
+pool) and each result must match its reference byte for byte, so a
+corrupted image or one plan's chart served for another is caught. RSS is
+sampled between rounds to spot figures that are never released:
+
+    python benchmarks/chart_stress.py --threads 16 --series 24 --rounds 5
+"""
+import os
+import sys
+import random
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from charts import CHART_KINDS, RENDERERS, ChartRenderCache
+
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_series(count, seed=7):
+    rng = random.Random(seed)
+    names = ['Tomato', 'Carrot', 'Potato', 'Lettuce', 'Cucumber', 'Pepper', 'Onion', 'Beans']
+    series = []
+    for i in range(count):
+        crops = rng.sample(names, rng.randint(1, len(names)))
+        labels = [f"{name} #{i}" for name in crops]
+        series.append({
+            'pie': {'labels': labels, 'values': [rng.randint(1, 40) for _ in crops]},
+            'bar': {'labels': labels, 'values': [round(rng.uniform(1, 120), 1) for _ in crops]},
+        })
+    return series
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--series', type=int, default=24, help='distinct plans to render')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-growth-mb', type=float, default=30.0)
+    args = parser.parse_args()
+
+    _, _, functions = RENDERERS['matplotlib']
+    all_series = make_series(args.series)
+    jobs = [(i, kind) for i in range(len(all_series)) for kind in CHART_KINDS]
+
+    print(f"Rendering {len(jobs)} reference charts serially...")
+    expected = {(i, kind): digest(functions[kind](all_series[i][kind])) for i, kind in jobs}
+
+    def check(label, render):
+        failures = 0
+        with ThreadPoolExecutor(args.threads) as executor:
+            shuffled = random.sample(jobs, len(jobs))
+            for (i, kind), data in zip(shuffled, executor.map(lambda job: render(*job), shuffled)):
+                if not data.startswith(b'\x89PNG') or digest(data) != expected[(i, kind)]:
+                    failures += 1
+        print(f"  {label}: {len(jobs) - failures}/{len(jobs)} charts match")
+        return failures
+
+    failures = 0
+    rss = []
+    for round_number in range(1, args.rounds + 1):
+        print(f"Round {round_number}/{args.rounds} ({args.threads} threads)")
+        failures += check('in-thread', lambda i, kind: functions[kind](all_series[i][kind]))
+
+        # A fresh cache each round so every chart is rendered again by the pool
+        cache = ChartRenderCache(max_entries=len(jobs), processes=args.processes)
+        try:
+            failures += check(f'process pool x{args.processes}', lambda i, kind: cache.render(kind, all_series[i]))
+        finally:
+            cache.shutdown()
+        rss.append(current_rss_mb())
+        print(f"  RSS {rss[-1]:.1f} MB")
+
+    # The first round pays for fonts and caches; growth after that is a leak
+    growth = rss[-1] - rss[0]
+    print(f"RSS growth after round 1: {growth:+.1f} MB")
+    if failures or growth > args.max_growth_mb:
+        sys.exit(f"FAILED: {failures} mismatched charts, {growth:+.1f} MB growth")
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Worker cold start: app import time and per-worker memory, with and without preload.
+
+Import time is measured in fresh interpreters (median of --runs). For
+memory, --workers processes are forked the way gunicorn does it: either
+each worker imports the app after the fork, or (--preload) the master
+imports it once with PRELOAD_MODULES=1 and the workers inherit it. Each
+worker answers one request and then reports its RSS, PSS (shared pages
+split between the processes sharing them) and private memory from
+/proc/self/smaps_rollup (Linux only):
+
+    python benchmarks/cold_start.py --runs 5 --workers 4
+    python benchmarks/cold_start.py --workers 4 --preload
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HEAVY = ('google.genai', 'numpy', 'matplotlib')
+
+
+def load_app():
+    """The Flask app, from create_app() or, on older trees, the module-level app."""
+    import app as module
+    factory = getattr(module, 'create_app', None)
+    return factory() if factory else module.app
+
+
+def measure_import():
+    started = time.perf_counter()
+    load_app()
+    elapsed = time.perf_counter() - started
+    return {
+        'import_s': round(elapsed, 3),
+        'rss_mb': round(memory()['Rss'] / 1024, 1),
+        'heavy_modules': [name for name in HEAVY if name in sys.modules],
+    }
+
+
+def memory(pid='self'):
+    """kB values from smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    values['Private'] = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values
+
+
+def run_workers(count, preload):
+    app = load_app() if preload else None
+    pipes = []
+    for _ in range(count):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            worker_app = app or load_app()
+            worker_app.test_client().get('/login')
+            os.write(write_end, b'ready')
+            os.close(write_end)
+            time.sleep(60)
+            os._exit(0)
+        os.close(write_end)
+        pipes.append((pid, read_end))
+
+    workers = []
+    for pid, read_end in pipes:
+        os.read(read_end, 5)
+        os.close(read_end)
+    # Every worker is up, so the PSS split reflects all of them
+    for pid, _ in pipes:
+        values = memory(pid)
+        workers.append({key: round(values[key] / 1024, 1) for key in ('Rss', 'Pss', 'Private')})
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+    return {
+        'preload': preload,
+        'workers': count,
+        'rss_mb': round(statistics.mean(w['Rss'] for w in workers), 1),
+        'pss_mb': round(statistics.mean(w['Pss'] for w in workers), 1),
+        'private_mb': round(statistics.mean(w['Private'] for w in workers), 1),
+    }
+
+
+def child(args, mode):
+    env = dict(os.environ)
+    env.setdefault('GEMINI_API_KEY', 'cold-start')
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='garden-cold-'), 'garden.db')}"
+    if mode == 'preload':
+        env['PRELOAD_MODULES'] = '1'
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--workers', str(args.workers)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters for the import timing')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--preload', action='store_true', help='also measure workers forked from a preloaded master')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == 'import':
+        print(json.dumps(measure_import()))
+        return
+    if args.child in ('fork', 'preload'):
+        print(json.dumps(run_workers(args.workers, args.child == 'preload')))
+        return
+
+    imports = [child(args, 'import') for _ in range(args.runs)]
+    print(f"import + app creation: median {statistics.median(i['import_s'] for i in imports):.3f}s, "
+          f"RSS {statistics.median(i['rss_mb'] for i in imports):.1f} MB, "
+          f"heavy modules loaded: {', '.join(imports[0]['heavy_modules']) or 'none'}")
+
+    for mode in ['fork'] + (['preload'] if args.preload else []):
+        result = child(args, mode)
+        label = 'preloaded master' if result['preload'] else 'import per worker'
+        print(f"{result['workers']} workers, {label}: RSS {result['rss_mb']} MB, "
+              f"PSS {result['pss_mb']} MB, private {result['private_mb']} MB per worker")
+
+
+if __name__ == '__main__':
+    main()
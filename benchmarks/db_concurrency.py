@@ -0,0 +1,164 @@
+"""Many parallel plan inserts against SQLite, default vs production mode.
+
+Each mode gets a fresh database file. Worker processes (like gunicorn
+workers) each run writer threads that insert and commit GardenPlan rows
+one at a time, while a reader thread pages through the account listing:
+
+    python benchmarks/db_concurrency.py --processes 4 --threads 8 --inserts 50
+
+Exits non-zero if production mode hits any "database is locked" error or
+loses a row.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from database import db, init_database
+from models import User, GardenPlan
+
+
+def make_app(path, production):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['DB_PRODUCTION'] = production
+    init_database(app)
+    return app
+
+
+def worker(path, production, threads, inserts, user_id, results):
+    app = make_app(path, production)
+    counts = {'inserted': 0, 'locked': 0, 'other_errors': 0, 'reads': 0}
+    lock = threading.Lock()
+    writers_done = threading.Event()
+
+    def write(thread_number):
+        for i in range(inserts):
+            with app.app_context():
+                try:
+                    db.session.add(GardenPlan(
+                        plan_name=f"Plan {os.getpid()}-{thread_number}-{i}", user_id=user_id,
+                        location='Almaty', garden_type='open_ground', garden_size=20,
+                        crop_data='[{"name": "Tomato", "area": 5}]', optimized_layout='{}',
+                        estimated_yield='{}', planting_periods='{}', smart_advice='{}'
+                    ))
+                    db.session.commit()
+                    key = 'inserted'
+                except OperationalError as e:
+                    db.session.rollback()
+                    key = 'locked' if 'locked' in str(e) else 'other_errors'
+            with lock:
+                counts[key] += 1
+
+    def read():
+        while not writers_done.is_set():
+            with app.app_context():
+                try:
+                    GardenPlan.summaries_for_user(user_id, limit=20)
+                    key = 'reads'
+                except OperationalError as e:
+                    key = 'locked' if 'locked' in str(e) else 'other_errors'
+            with lock:
+                counts[key] += 1
+
+    writers = [threading.Thread(target=write, args=(n,)) for n in range(threads)]
+    reader = threading.Thread(target=read)
+    reader.start()
+    for t in writers:
+        t.start()
+    for t in writers:
+        t.join()
+    writers_done.set()
+    reader.join()
+    results.put(counts)
+
+
+def run_mode(production, processes, threads, inserts):
+    path = os.path.join(tempfile.mkdtemp(prefix='garden-db-'), 'garden.db')
+    app = make_app(path, production)
+    with app.app_context():
+        db.create_all()
+        user = User(username='loadtest', email='loadtest@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        # Do not hand open connections to the forked workers
+        db.session.remove()
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    started = time.perf_counter()
+    procs = [context.Process(target=worker, args=(path, production, threads, inserts, user_id, results))
+             for _ in range(processes)]
+    for p in procs:
+        p.start()
+    totals = {'inserted': 0, 'locked': 0, 'other_errors': 0, 'reads': 0}
+    for _ in procs:
+        for key, value in results.get().items():
+            totals[key] += value
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        rows = GardenPlan.query.count()
+    return {
+        'mode': 'production' if production else 'default',
+        'journal_mode': journal_mode,
+        'expected': processes * threads * inserts,
+        'rows': rows,
+        **totals,
+        'seconds': round(elapsed, 2),
+        'inserts_per_s': round(rows / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='writer threads per process')
+    parser.add_argument('--inserts', type=int, default=50, help='commits per writer thread')
+    parser.add_argument('--modes', default='default,production')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child == 'production', args.processes, args.threads, args.inserts)))
+        return
+
+    results = []
+    for mode in args.modes.split(','):
+        # A fresh interpreter per mode so engines and pragmas do not leak across runs
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', mode, '--processes', str(args.processes),
+             '--threads', str(args.threads), '--inserts', str(args.inserts)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    columns = ['mode', 'journal_mode', 'expected', 'rows', 'locked', 'other_errors', 'reads', 'seconds', 'inserts_per_s']
+    print("  ".join(f"{c:>13}" for c in columns))
+    for result in results:
+        print("  ".join(f"{str(result[c]):>13}" for c in columns))
+
+    for result in results:
+        if result['mode'] == 'production' and (result['locked'] or result['other_errors'] or result['rows'] != result['expected']):
+            sys.exit("FAILED: production mode lost writes or hit lock errors")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Microbenchmarks for the planner's hot paths, offline and deterministic.
+
+Gemini is replaced by an in-process fake that answers every prompt the
+way gemini_stub.py does, the database, caches and budgets live in a
+temporary directory, and each benchmark reports min/median/p95 over
+--runs timed calls:
+
+    python benchmarks/hot_paths.py --output baseline.json
+    python benchmarks/hot_paths.py --baseline baseline.json --output current.json
+
+With --baseline, every benchmark whose median is more than --threshold
+slower than the stored one is flagged and the script exits non-zero.
+Timings only compare on the same machine and Python.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CROP_NAMES = ['Tomato', 'Carrot', 'Potato', 'Lettuce', 'Cucumber', 'Pepper', 'Onion', 'Beans', 'Cabbage', 'Zucchini',
+              'Garlic', 'Spinach', 'Beet', 'Peas', 'Corn', 'Squash', 'Radish', 'Leek', 'Melon', 'Strawberry']
+
+
+class FakeModels:
+    """models.generate_content answering like gemini_stub, without HTTP."""
+
+    def __init__(self):
+        from gemini_stub import response_for_prompt
+        self._answer = response_for_prompt
+        self.calls = 0
+
+    def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        return SimpleNamespace(text=json.dumps(self._answer(contents)), usage_metadata=None)
+
+
+def garden(crop_count, size=100.0):
+    return {
+        'location': 'Almaty', 'garden_type': 'open_ground', 'garden_size': size,
+        'soil_type': 'loamy', 'sunlight': 'full_sun', 'watering_frequency': '2_3_times',
+        'main_goal': 'max_yield', 'pest_prevention': True,
+        'crops': [{'name': CROP_NAMES[i % len(CROP_NAMES)], 'area': round(size / crop_count, 1)}
+                  for i in range(crop_count)],
+    }
+
+
+def isolate(workdir, renderer):
+    """Point every file the app writes at workdir; must run before app is imported."""
+    from config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'garden.db')}"
+    Config.GEMINI_BUDGET_PATH = os.path.join(workdir, 'gemini_budget.db')
+    Config.GEMINI_RPM = Config.GEMINI_TPM = 10 ** 9
+    Config.PLAN_CACHE_ENABLED = False
+    Config.CROP_FRAGMENTS_ENABLED = False
+    Config.CHART_STORE_DIR = os.path.join(workdir, 'charts')
+    Config.CHART_RENDERER = renderer
+    Config.CHART_RENDER_PROCESSES = 0
+    Config.PROFILER_ENABLED = False
+
+
+def timed(func, runs, warmup=1):
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return {
+        'runs': runs,
+        'min_ms': round(times[0], 4),
+        'median_ms': round(statistics.median(times), 4),
+        'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))], 4),
+    }
+
+
+def add_plans(db, GardenPlan, user_id, count, started):
+    """Insert count plan rows for one user in a few executemany batches."""
+    rows = [{
+        'plan_name': f'Plan {i}', 'user_id': user_id, 'location': 'Almaty', 'garden_type': 'open_ground',
+        'garden_size': 20.0, 'soil_type': 'loamy', 'sunlight': 'full_sun',
+        'crop_data': '[{"name": "Tomato", "area": 5}]', 'optimized_layout': '{}', 'estimated_yield': '{}',
+        'planting_periods': '{}', 'smart_advice': '{}', 'created_at': started + timedelta(minutes=i),
+    } for i in range(count)]
+    for i in range(0, count, 1000):
+        db.session.execute(GardenPlan.__table__.insert(), rows[i:i + 1000])
+    db.session.commit()
+
+
+def run_suite(args):
+    from app import create_app, init_db
+    from config import Config
+    from database import db
+    from models import User, GardenPlan
+    from charts import RENDERERS, build_chart_series
+
+    fake = FakeModels()
+    app = create_app()
+    with app.app_context(), redirect_stdout(io.StringIO()):
+        init_db()
+    generator = app.extensions['garden'].ai_generator
+    generator.client = generator.gemini.client = SimpleNamespace(models=fake)
+
+    results = {}
+
+    def bench(name, func, runs=args.runs):
+        # generate_plan and the views print per call
+        with redirect_stdout(io.StringIO()):
+            results[name] = timed(func, runs)
+        print(f"{name:>32}  median {results[name]['median_ms']:>10.3f} ms  p95 {results[name]['p95_ms']:>10.3f} ms")
+
+    four, twenty = garden(4), garden(20)
+    bench('create_prompt[4 crops]', lambda: generator._create_prompt(four))
+    bench('create_prompt[20 crops]', lambda: generator._create_prompt(twenty))
+    bench('generate_plan[4 crops]', lambda: generator.generate_plan(four))
+    bench('generate_plan[20 crops]', lambda: generator.generate_plan(twenty))
+
+    for crops in (1, 5, 10, Config.MAX_CROPS):
+        data = garden(crops)
+        bench(f'fallback_plan[{crops} crops]', lambda: generator._get_fallback_plan(data, 'benchmark'))
+
+    # Charts, uncached, one render function call per chart
+    plan = generator._get_fallback_plan(garden(6), 'benchmark')
+    series = build_chart_series(garden(6), plan)
+    for kind, render in RENDERERS[args.renderer][2].items():
+        bench(f'chart_{kind}[{args.renderer}]', lambda: render(series[kind]))
+
+    # Database and page paths through the test client
+    client = app.test_client()
+    with app.app_context():
+        users = {}
+        for count in args.plans:
+            user = User(username=f'bench{count}', email=f'bench{count}@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+            users[count] = user.id
+            add_plans(db, GardenPlan, user.id, count, datetime(2024, 1, 1))
+        insert_user = users[args.plans[0]]
+        with redirect_stdout(io.StringIO()):
+            ai_plan = generator.generate_plan(four)
+
+        def insert():
+            db.session.add(GardenPlan.from_generated(insert_user, four, ai_plan))
+            db.session.commit()
+        bench('plan_insert', insert)
+        plan_id = db.session.query(db.func.max(GardenPlan.id)).filter(GardenPlan.user_id == insert_user).scalar()
+        db.session.remove()
+
+    def login(user_id):
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+
+    login(insert_user)
+    bench('view_plan', lambda: get(f'/plan/{plan_id}'))
+    # Same page with the user loader going to the database on every request
+    ttl, app.config['USER_CACHE_TTL'] = app.config['USER_CACHE_TTL'], 0
+    bench('view_plan[no user cache]', lambda: get(f'/plan/{plan_id}'))
+    app.config['USER_CACHE_TTL'] = ttl
+    for count, user_id in users.items():
+        login(user_id)
+        bench(f'account[{count} plans]', lambda: get('/account'))
+
+    return results
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'commit': commit,
+        'renderer': args.renderer,
+        'runs': args.runs,
+        'date': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print current vs baseline medians; return the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':>32}  {'baseline ms':>12}  {'current ms':>12}  {'change':>8}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:>32}  {'-':>12}  {current['median_ms']:>12.3f}  {'new':>8}")
+            continue
+        change = current['median_ms'] / before['median_ms'] - 1 if before['median_ms'] else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:>32}  {before['median_ms']:>12.3f}  {current['median_ms']:>12.3f}  {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=30, help='timed calls per benchmark')
+    parser.add_argument('--plans', default='10,1000,10000', help='plans per user for the account listing')
+    parser.add_argument('--renderer', default='svg', choices=('matplotlib', 'svg'))
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against a JSON file written by --output')
+    parser.add_argument('--threshold', type=float, default=0.15, help='median slowdown flagged as a regression')
+    args = parser.parse_args()
+    args.plans = [int(n) for n in args.plans.split(',')]
+
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    isolate(tempfile.mkdtemp(prefix='garden-bench-'), args.renderer)
+    results = run_suite(args)
+
+    report = {'environment': environment(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nno regressions over {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+"""Ramp concurrent user sessions against the app and find where it saturates.
+
+Starts gemini_stub (with injected latency and 429s) and the app on a
+fresh temporary database in a child process, then runs virtual users in
+stages of increasing concurrency. Each user registers, logs in and
+repeatedly creates a plan with random crops, lists and views its plans,
+opens the account page and sometimes deletes a plan:
+
+    python benchmarks/load_test.py --stages 1,2,4,8,16,32 --stage-seconds 20 --latency 1.5 --error-rate 0.05
+    python benchmarks/load_test.py --target http://127.0.0.1:8000   # an already running deployment
+
+Per stage it reports throughput, p50/p95/p99 latency per route, error
+and fallback rates, and Gemini stub traffic. The saturation point is the
+first stage that stops adding at least --knee of throughput or breaks
+the SLO (--slo-p95 for create_plan, --slo-errors).
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CROPS = ['Tomato', 'Carrot', 'Potato', 'Lettuce', 'Cucumber', 'Pepper', 'Onion', 'Beans', 'Cabbage', 'Zucchini',
+         'Garlic', 'Spinach', 'Beet', 'Peas', 'Corn', 'Squash', 'Radish', 'Leek', 'Melon', 'Strawberry']
+LOCATIONS = ['Almaty', 'Astana', 'Berlin', 'Toronto', 'Lyon', 'Nairobi', 'Madrid', 'Oslo']
+ROUTES = ('register', 'login', 'create_plan', 'api_plans', 'view_plan', 'account', 'delete_plan')
+PASSWORD = 'Garden-Load-2024!'
+
+
+def serve(args):
+    """Child process: the app on a temporary database, served by werkzeug's threaded server."""
+    workdir = tempfile.mkdtemp(prefix='garden-load-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'garden.db')}"
+    os.environ['GEMINI_BASE_URL'] = args.gemini_url
+    os.environ['GEMINI_RPM'] = str(args.rpm)
+    os.environ.setdefault('GEMINI_API_KEY', 'load-test')
+    from config import Config
+    Config.GEMINI_BUDGET_PATH = os.path.join(workdir, 'gemini_budget.db')
+    Config.PLAN_CACHE_PATH = os.path.join(workdir, 'plan_cache.db')
+    Config.CROP_FRAGMENTS_PATH = os.path.join(workdir, 'crop_fragments.db')
+    Config.CHART_STORE_DIR = os.path.join(workdir, 'charts')
+    Config.PROFILE_DIR = os.path.join(workdir, 'profiles')
+
+    from werkzeug.serving import make_server
+    from app import create_app, init_db
+    app = create_app()
+    with app.app_context():
+        init_db()
+    server = make_server('127.0.0.1', args.port, app, threaded=True)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    print(f"serving on http://127.0.0.1:{server.server_port}", flush=True)
+    server.serve_forever()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Time each route on its own; a redirect is its answer
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {route: [] for route in ROUTES}
+        self.errors = {route: 0 for route in ROUTES}
+        self.plans = 0
+        self.fallbacks = 0
+
+    def add(self, route, seconds, ok):
+        with self.lock:
+            self.samples[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+    def plan(self, fallback):
+        with self.lock:
+            self.plans += 1
+            self.fallbacks += fallback
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, rng, timeout):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.rng = rng
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def request(self, route, path, data=None, expect=(200,), headers=None, location=None):
+        """(ok, body); with location, ok also needs a redirect to that path."""
+        body = urllib.parse.urlencode(data, doseq=True).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers or {})
+        started = time.perf_counter()
+        redirect = ''
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, text = response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            status, text = e.code, e.read().decode('utf-8', 'replace')
+            redirect = e.headers.get('Location', '')
+        except OSError:
+            status, text = None, ''
+        ok = status in expect and (location is None or urllib.parse.urlsplit(redirect).path == location)
+        self.recorder.add(route, time.perf_counter() - started, ok)
+        return ok, text
+
+    def plan_form(self):
+        crops = self.rng.sample(CROPS, self.rng.randint(1, 6))
+        size = self.rng.choice([10, 20, 50, 100, 250])
+        return {
+            'location': self.rng.choice(LOCATIONS),
+            'garden_type': self.rng.choice(['open_ground', 'greenhouse', 'both']),
+            'garden_size': str(size),
+            'soil_type': self.rng.choice(['loamy', 'sandy', 'clay']),
+            'sunlight': self.rng.choice(['full_sun', 'partial_shade']),
+            'main_goal': self.rng.choice(['max_yield', 'consumption']),
+            'pest_prevention': self.rng.choice(['yes', 'no']),
+            'crop_name[]': crops,
+            # Rounded down so the crops never add up to more than the garden
+            'crop_area[]': [str(math.floor(size / len(crops) * 10) / 10)] * len(crops),
+        }
+
+    def run(self, stop, plans_per_session):
+        """One session: register, log in, then create/list/view/delete until stop."""
+        username = f"load{self.rng.getrandbits(48):x}"
+        ok, _ = self.request('register', '/register', {
+            'username': username, 'email': f'{username}@example.com',
+            'password': PASSWORD, 'confirm_password': PASSWORD
+        }, expect=(302,))
+        if not ok:
+            return
+        # Registering logs the user in; start over so /login really checks the password
+        self.cookies.clear()
+        ok, _ = self.request('login', '/login', {'username': username, 'password': PASSWORD},
+                             expect=(302,), location='/account')
+        if not ok:
+            return
+
+        for _ in range(plans_per_session):
+            if stop.is_set():
+                return
+            ok, page = self.request('create_plan', '/create-plan', self.plan_form())
+            if ok:
+                self.recorder.plan('id="fallbackNote"' in page)
+            ok, listing = self.request('api_plans', '/api/plans?limit=5', headers={'Accept': 'application/json'})
+            plans = json.loads(listing).get('plans', []) if ok else []
+            if plans:
+                self.request('view_plan', f"/plan/{self.rng.choice(plans)['id']}")
+            self.request('account', '/account')
+            if plans and self.rng.random() < 0.3:
+                self.request('delete_plan', f"/delete-plan/{plans[-1]['id']}", expect=(302,))
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def stub_counts(gemini_url):
+    if not gemini_url:
+        return None
+    try:
+        with urllib.request.urlopen(gemini_url + '/stats', timeout=5) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return None
+
+
+def run_stage(base_url, concurrency, seconds, args, seed):
+    recorder = Recorder()
+    stop = threading.Event()
+
+    def user_loop(number):
+        rng = random.Random(seed * 1000 + number)
+        while not stop.is_set():
+            VirtualUser(base_url, recorder, rng, args.timeout).run(stop, args.plans_per_session)
+
+    before = stub_counts(args.gemini_url)
+    threads = [threading.Thread(target=user_loop, args=(n,), daemon=True) for n in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    after = stub_counts(args.gemini_url)
+
+    routes = {}
+    total = errors = 0
+    for route in ROUTES:
+        samples = recorder.samples[route]
+        if not samples:
+            continue
+        total += len(samples)
+        errors += recorder.errors[route]
+        routes[route] = {
+            'requests': len(samples),
+            'errors': recorder.errors[route],
+            'p50_ms': round(percentile(samples, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(samples, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(samples, 0.99) * 1000, 1),
+        }
+    stage = {
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 1),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2),
+        'plans_per_min': round(recorder.plans / elapsed * 60, 1),
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'fallback_rate': round(recorder.fallbacks / recorder.plans, 4) if recorder.plans else 0.0,
+        'routes': routes,
+    }
+    if before is not None and after is not None:
+        stage['gemini_calls'] = after['requests'] - before['requests']
+        stage['gemini_429s'] = after['rate_limited'] - before['rate_limited']
+    return stage
+
+
+def meets_slo(stage, args):
+    create = stage['routes'].get('create_plan')
+    return (create is not None and create['p95_ms'] <= args.slo_p95
+            and stage['error_rate'] <= args.slo_errors)
+
+
+def saturation(stages, args):
+    """(last stage within the SLO, first stage that stopped scaling)."""
+    within = None
+    knee = None
+    for previous, stage in zip([None] + stages, stages):
+        if meets_slo(stage, args):
+            within = stage
+        if knee is None and previous is not None:
+            gain = stage['throughput_rps'] / previous['throughput_rps'] - 1 if previous['throughput_rps'] else 0
+            if gain < args.knee or not meets_slo(stage, args):
+                knee = stage
+    return within, knee
+
+
+def print_stage(stage):
+    extra = ''
+    if 'gemini_calls' in stage:
+        extra = f"  gemini {stage['gemini_calls']} calls / {stage['gemini_429s']} 429s"
+    print(f"\n== {stage['concurrency']} users: {stage['throughput_rps']} req/s, {stage['plans_per_min']} plans/min, "
+          f"errors {stage['error_rate']:.1%}, fallbacks {stage['fallback_rate']:.1%}{extra}")
+    print(f"   {'route':>12} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, r in stage['routes'].items():
+        print(f"   {route:>12} {r['requests']:>9} {r['errors']:>7} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+
+def start_server(args):
+    child = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', '--port', '0',
+         '--gemini-url', args.gemini_url, '--rpm', str(args.rpm)],
+        stdout=subprocess.PIPE, text=True
+    )
+    for line in child.stdout:
+        match = re.search(r'serving on (http://\S+)', line)
+        if match:
+            # Keep draining the app's prints so the pipe never fills up
+            threading.Thread(target=lambda: [None for _ in child.stdout], daemon=True).start()
+            return child, match.group(1)
+    raise RuntimeError(f"app server exited with {child.wait()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stages', default='1,2,4,8,16', help='concurrent users per stage')
+    parser.add_argument('--stage-seconds', type=float, default=15)
+    parser.add_argument('--plans-per-session', type=int, default=5, help='plans a user creates before a new user starts')
+    parser.add_argument('--target', help='base URL of a running app instead of starting one')
+    parser.add_argument('--latency', type=float, default=1.0, help='stub seconds per Gemini call')
+    parser.add_argument('--jitter', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.05, help='fraction of Gemini calls answered 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--rpm', type=int, default=1000, help='GEMINI_RPM for the started app')
+    parser.add_argument('--slo-p95', type=float, default=5000, help='create_plan p95 ms')
+    parser.add_argument('--slo-errors', type=float, default=0.01, help='error rate')
+    parser.add_argument('--knee', type=float, default=0.10, help='throughput gain below which a stage is saturated')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the stages and summary to this JSON file')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--gemini-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args)
+
+    child = None
+    if args.target:
+        base_url = args.target.rstrip('/')
+    else:
+        from gemini_stub import start_stub_server
+        _, args.gemini_url = start_stub_server(
+            latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate, retry_after=args.retry_after
+        )
+        child, base_url = start_server(args)
+    print(f"load testing {base_url}")
+
+    stages = []
+    try:
+        for number, concurrency in enumerate(int(n) for n in args.stages.split(',')):
+            stage = run_stage(base_url, concurrency, args.stage_seconds, args, args.seed + number)
+            print_stage(stage)
+            stages.append(stage)
+    finally:
+        if child is not None:
+            child.terminate()
+            child.wait()
+
+    within, knee = saturation(stages, args)
+    print()
+    if within:
+        print(f"capacity within SLO: {within['concurrency']} concurrent users, "
+              f"{within['throughput_rps']} req/s, {within['plans_per_min']} plans/min")
+    else:
+        print("no stage met the SLO")
+    if knee:
+        print(f"saturation point: {knee['concurrency']} concurrent users ({knee['throughput_rps']} req/s)")
+    else:
+        print("did not saturate; add higher stages")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'settings': {k: v for k, v in vars(args).items() if k not in ('serve', 'port')},
+                'stages': stages,
+                'capacity_users': within['concurrency'] if within else None,
+                'saturation_users': knee['concurrency'] if knee else None,
+            }, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
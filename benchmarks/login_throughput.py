@@ -0,0 +1,137 @@
+"""Login throughput, and plan-page latency during a login burst.
+
+Runs --login-threads threads that log in as fast as they can while
+--view-threads threads keep loading a plan page, against a temporary
+database. Each mode sets the password hasher pool; "inline" gives every
+login thread its own hashing slot and no queue limit, which is how the
+app behaved when routes hashed in the request thread:
+
+    python benchmarks/login_throughput.py --login-threads 16 --seconds 10
+    python benchmarks/login_throughput.py --method pbkdf2:sha256:600000 --modes bounded
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+PASSWORD = 'Garden-Bench-2024!'
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def make_app(workers, queue):
+    from app import create_app
+    app = create_app()
+    app.config.update(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE=queue)
+    return app
+
+
+def setup(app, users):
+    """users accounts sharing one password hash, plus one plan to view."""
+    from app import init_db
+    from database import db
+    from models import User, GardenPlan
+    with app.app_context():
+        with redirect_stdout(io.StringIO()):
+            init_db()
+        password_hash = app.extensions['garden'].password_hasher.hash(PASSWORD)
+        db.session.add_all([User(username=f'login{i}', email=f'login{i}@example.com', password_hash=password_hash)
+                            for i in range(users)])
+        db.session.add(User(username='viewer', email='viewer@example.com', password_hash=password_hash))
+        db.session.commit()
+        viewer = User.query.filter_by(username='viewer').one()
+        plan = GardenPlan(plan_name='Plan', user_id=viewer.id, location='Almaty', garden_type='open_ground',
+                          garden_size=20, crop_data='[{"name": "Tomato", "area": 5}]', optimized_layout='{}',
+                          estimated_yield='{}', planting_periods='{}', smart_advice='{}')
+        db.session.add(plan)
+        db.session.commit()
+        return viewer.id, plan.id
+
+
+def run_mode(label, workers, queue, args, viewer_id, plan_id):
+    app = make_app(workers, queue)
+    stop = threading.Event()
+    counts = {'ok': 0, 'shed': 0, 'other': 0}
+    views = []
+    lock = threading.Lock()
+
+    def login_loop(number):
+        while not stop.is_set():
+            client = app.test_client()
+            response = client.post('/login', data={'username': f'login{number % args.users}', 'password': PASSWORD})
+            key = {302: 'ok', 503: 'shed'}.get(response.status_code, 'other')
+            with lock:
+                counts[key] += 1
+
+    def view_loop():
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(viewer_id)
+            session['_fresh'] = True
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get(f'/plan/{plan_id}')
+            with lock:
+                views.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=login_loop, args=(n,)) for n in range(args.login_threads)]
+    threads += [threading.Thread(target=view_loop) for _ in range(args.view_threads)]
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+    app.extensions['garden'].shutdown()
+
+    print(f"{label:>8} (workers {workers}, queue {queue}): {counts['ok'] / elapsed:7.1f} logins/s, "
+          f"{counts['shed']} shed with 503, {counts['other']} other; plan page during burst "
+          f"p50 {statistics.median(views) * 1000 if views else 0:.1f} ms, "
+          f"p95 {percentile(views, 0.95) * 1000:.1f} ms over {len(views)} views")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--view-threads', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--method', default=Config.PASSWORD_HASH_METHOD, help='werkzeug hash method')
+    parser.add_argument('--workers', type=int, default=Config.PASSWORD_HASH_WORKERS, help='bounded mode pool size')
+    parser.add_argument('--queue', type=int, default=Config.PASSWORD_HASH_QUEUE, help='bounded mode queue limit')
+    parser.add_argument('--modes', default='inline,bounded')
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    workdir = tempfile.mkdtemp(prefix='garden-login-')
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'garden.db')}"
+    Config.PASSWORD_HASH_METHOD = args.method
+    Config.PROFILER_ENABLED = False
+
+    viewer_id, plan_id = setup(make_app(args.workers, args.queue), args.users)
+    print(f"method {args.method}, {args.login_threads} login threads, {args.view_threads} plan viewers, "
+          f"{os.cpu_count()} CPUs")
+    for mode in args.modes.split(','):
+        if mode == 'inline':
+            run_mode('inline', args.login_threads, args.login_threads, args, viewer_id, plan_id)
+        else:
+            run_mode('bounded', args.workers, args.queue, args, viewer_id, plan_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Prompt tokens and Gemini latency, old indented prompt vs prompt_builder.
+
+Builds both prompts for a set of representative gardens and reports their
+size (local token estimate, or the SDK's count_tokens with --sdk-count)
+and build time. With --live each prompt is also sent to Gemini (or to
+GEMINI_BASE_URL; --stub starts the local gemini_stub) and the latency and
+billed prompt tokens are reported:
+
+    python benchmarks/prompt_size.py
+    GEMINI_API_KEY=... python benchmarks/prompt_size.py --live --sdk-count --runs 3
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crop_knowledge import yield_guidelines
+from prompt_builder import garden_prompt, estimate_tokens
+
+GARDENS = [
+    ('2 crops, balcony', 'Almaty', 'open_ground', 8, [('Tomato', 4), ('Basil', 1)]),
+    ('3 crops, greenhouse', 'Astana', 'greenhouse', 20, [('Cucumber', 8), ('Tomato', 8), ('Pepper', 4)]),
+    ('4 crops, allotment', 'Berlin', 'open_ground', 50, [('Potato', 25), ('Carrot', 10), ('Onion', 10), ('Beans', 5)]),
+    ('6 crops, family plot', 'Toronto', 'both', 100, [('Tomato', 20), ('Cucumber', 15), ('Lettuce', 10),
+                                                      ('Cabbage', 20), ('Zucchini', 20), ('Garlic', 15)]),
+    ('10 crops, market garden', 'Lyon', 'open_ground', 400, [
+        ('Potato', 80), ('Carrot', 40), ('Beet', 30), ('Onion', 40), ('Leek', 30), ('Peas', 40),
+        ('Beans', 40), ('Corn', 40), ('Squash', 40), ('Melon', 20)]),
+    ('unknown crop', 'Nairobi', 'open_ground', 30, [('Cassava', 20), ('Tomato', 10)]),
+]
+
+LEGACY_GUIDELINES = "\nIMPORTANT YIELD GUIDELINES - Use these realistic ranges PER 100 SQM and SCALE APPROPRIATELY for the actual garden size:\n" \
+    + "\n".join(yield_guidelines()) \
+    + "\n\nDO NOT EXCEED THESE RANGES. Be conservative and realistic, not optimistic.\nSCALE the yield based on the actual garden size. If garden is 50 sqm, use half of these values.\n"
+
+
+def legacy_prompt(data):
+    """The prompt as GardenAIGenerator built it before prompt_builder, kept for comparison."""
+    crops_list = ", ".join([f"{c['name']} ({c['area']}sqm)" for c in data.get('crops', [])])
+    structure = f"""{{
+                "optimized_layout": {{
+                    "crop_distribution": {{ "crop_name": "percentage%" }},
+                    "spatial_arrangement": "Detailed description of how to arrange plants",
+                    "companion_planting": ["list of good companions", "plants to avoid"],
+                    "crop_rotation": "Rotation strategy for next season"
+                }},
+                "estimated_yield": {{ "crop_name": "range in kg/season (scaled to garden size)" }},
+                "planting_periods": {{ "crop_name": "sowing month - harvest month" }},
+                "smart_advice": {{
+                    "irrigation": "Specific watering schedule and method",
+                    "soil_management": "Fertilizer and amendment recommendations",
+                    "local_risks": "Climate-specific challenges for {data.get('location')}",
+                    "pest_prevention": "Organic pest control methods" if {data.get('pest_prevention')} else "Standard pest monitoring"
+                }},
+                "additional_tips": ["tip1", "tip2", "tip3"]
+                }}"""
+    return f"""
+                ROLE: Professional Horticulture Consultant. You are an expert in vegetable gardening and crop yield prediction.
+
+                CONTEXT:
+                - Location: {data.get('location')} climate
+                - Garden size: {data.get('garden_size')} sqm
+                - Soil type: {data.get('soil_type')}
+                - Sunlight: {data.get('sunlight')}
+                - Growing environment: {data.get('garden_type')}
+                - Main goal: {data.get('main_goal')}
+                - Include pest prevention tips: {data.get('pest_prevention')}
+
+                CROPS TO PLAN: {crops_list}
+
+                {LEGACY_GUIDELINES}
+
+                TASK: Generate a comprehensive, data-driven garden plan for this specific location and garden size.
+
+                IMPORTANT:
+                1. Scale ALL yields to the ACTUAL garden size ({data.get('garden_size')} sqm), not per 100 sqm
+                2. Be conservative - it's better to underestimate than overestimate
+                3. Consider the specific growing environment (field vs greenhouse)
+                4. Account for crop spacing and companion planting
+
+                REQUIRED JSON STRUCTURE:
+                {structure}
+                """
+
+
+def garden_data(location, garden_type, size, crops):
+    return {
+        'location': location, 'garden_type': garden_type, 'garden_size': size,
+        'soil_type': 'loamy', 'sunlight': 'full_sun', 'main_goal': 'max_yield',
+        'pest_prevention': True, 'crops': [{'name': n, 'area': a} for n, a in crops],
+    }
+
+
+def build_time_us(build, data, repeat=2000):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        build(data)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def make_client(stub):
+    from google import genai
+    from google.genai import types
+    from config import Config
+    base_url = Config.GEMINI_BASE_URL
+    if stub:
+        from gemini_stub import start_stub_server
+        _, base_url = start_stub_server()
+    http_options = types.HttpOptions(base_url=base_url) if base_url else None
+    return genai.Client(api_key=os.environ.get('GEMINI_API_KEY', 'stub'), http_options=http_options)
+
+
+def call_gemini(client, model, prompt, runs):
+    """(median seconds, billed prompt tokens) over runs calls."""
+    from google.genai import types
+    config = types.GenerateContentConfig(response_mime_type='application/json', temperature=0.7)
+    times, billed = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.models.generate_content(model=model, contents=prompt, config=config)
+        times.append(time.perf_counter() - started)
+        billed = getattr(response.usage_metadata, 'prompt_token_count', None)
+    return statistics.median(times), billed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--live', action='store_true', help='send both prompts to Gemini and time them')
+    parser.add_argument('--stub', action='store_true', help='with --live, use an in-process gemini_stub')
+    parser.add_argument('--sdk-count', action='store_true', help="count tokens with the SDK's count_tokens")
+    parser.add_argument('--runs', type=int, default=3, help='Gemini calls per prompt with --live')
+    parser.add_argument('--model', default='gemini-2.5-flash-lite')
+    args = parser.parse_args()
+
+    client = make_client(args.stub) if args.live or args.sdk_count else None
+
+    def count(prompt):
+        if args.sdk_count:
+            return client.models.count_tokens(model=args.model, contents=prompt).total_tokens
+        return estimate_tokens(prompt)
+
+    columns = ['garden', 'old_tokens', 'new_tokens', 'saved', 'old_build_us', 'new_build_us']
+    if args.live:
+        columns += ['old_billed', 'new_billed', 'old_latency_s', 'new_latency_s']
+    print(f"token counter: {'sdk count_tokens' if args.sdk_count else 'local estimate'}")
+    print("  ".join(f"{c:>24}" if c == 'garden' else f"{c:>13}" for c in columns))
+
+    totals = {'old': 0, 'new': 0}
+    for label, location, garden_type, size, crops in GARDENS:
+        data = garden_data(location, garden_type, size, crops)
+        old, new = legacy_prompt(data), garden_prompt(data)
+        row = {
+            'garden': label,
+            'old_tokens': count(old),
+            'new_tokens': count(new),
+            'old_build_us': round(build_time_us(legacy_prompt, data), 1),
+            'new_build_us': round(build_time_us(garden_prompt, data), 1),
+        }
+        row['saved'] = f"{1 - row['new_tokens'] / row['old_tokens']:.0%}"
+        totals['old'] += row['old_tokens']
+        totals['new'] += row['new_tokens']
+        if args.live:
+            row['old_latency_s'], row['old_billed'] = call_gemini(client, args.model, old, args.runs)
+            row['new_latency_s'], row['new_billed'] = call_gemini(client, args.model, new, args.runs)
+            row['old_latency_s'] = round(row['old_latency_s'], 2)
+            row['new_latency_s'] = round(row['new_latency_s'], 2)
+        print("  ".join(f"{str(row[c]):>24}" if c == 'garden' else f"{str(row[c]):>13}" for c in columns))
+
+    print(f"total prompt tokens: {totals['old']} -> {totals['new']} ({1 - totals['new'] / totals['old']:.0%} fewer)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import os
+import re
+import hashlib
+import tempfile
+
+HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ChartStore:
+    """Content-addressed PNG store under data/charts.
+
+    Files are named by the SHA-256 of their bytes, so a chart is written
+    once, never changes, and can be served with immutable cache headers.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, chart_hash):
+        if not HASH_RE.match(chart_hash or ''):
+            raise ValueError(f"Invalid chart hash: {chart_hash!r}")
+        return os.path.join(self.root, chart_hash[:2], f"{chart_hash}.png")
+
+    def put(self, data):
+        chart_hash = hashlib.sha256(data).hexdigest()
+        path = self.path_for(chart_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return chart_hash
+
+    def get(self, chart_hash):
+        try:
+            with open(self.path_for(chart_hash), 'rb') as f:
+                return f.read()
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,223 @@
+import io
+import re
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from svg_charts import render_pie_svg, render_bar_svg
+from metrics import span, count, STAGE_SECONDS
+
+# Bump whenever the chart styling changes so old renders are not reused
+RENDERER_VERSION = 1
+
+CHART_KINDS = ('pie', 'bar')
+
+
+def parse_to_val(val_str):
+    # HELPER FUNCTION: This is the important part using 're'
+    # It turns "60-100kg" into 80.0 so the chart doesn't show 60,000
+    nums = re.findall(r'\d+\.?\d*', str(val_str))
+    if len(nums) >= 2:
+        return (float(nums[0]) + float(nums[1])) / 2
+    return float(nums[0]) if nums else 0
+
+
+def build_chart_series(garden_data, plan_data):
+    """The numbers behind both charts; plans store this instead of images."""
+    dist = plan_data.get('optimized_layout', {}).get('crop_distribution', {})
+    if dist:
+        pie = {'labels': list(dist.keys()), 'values': [parse_to_val(v) for v in dist.values()]}
+    else:
+        pie = {
+            'labels': [c['name'] for c in garden_data['crops']],
+            'values': [c['area'] for c in garden_data['crops']]
+        }
+
+    # We use parse_to_val to get the average of the range
+    yield_data = plan_data.get('estimated_yield') or {}
+    bar = {'labels': list(yield_data.keys()), 'values': [parse_to_val(v) for v in yield_data.values()]}
+    return {'pie': pie, 'bar': bar}
+
+
+def series_key(kind, series, renderer='matplotlib'):
+    """Cache key and ETag for one chart: its data plus the renderer and its version."""
+    payload = json.dumps(series.get(kind), sort_keys=True)
+    return hashlib.sha256(f"{renderer}:{kind}:{RENDERER_VERSION}:{payload}".encode('utf-8')).hexdigest()
+
+
+def _matplotlib():
+    # Imported on first use so workers using the SVG renderer never load matplotlib.
+    # Figure/FigureCanvasAgg keep no global state, unlike pyplot, so any
+    # number of threads can render at once.
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    return Figure, FigureCanvasAgg
+
+
+def _png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    return buf.getvalue()
+
+
+def render_pie(data):
+    Figure, FigureCanvasAgg = _matplotlib()
+    # 1. Pie Chart (Crop Distribution)
+    fig = Figure(figsize=(8, 6))
+    try:
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.pie(data['values'], labels=data['labels'], autopct='%1.1f%%', startangle=140, colors=['#6A8D53', '#8FB377', '#A9C296', '#D1D9C0'])
+        ax.set_title("Garden Area Distribution")
+        return _png(fig)
+    finally:
+        fig.clear()
+
+
+def render_bar(data):
+    Figure, FigureCanvasAgg = _matplotlib()
+    # 2. Bar Chart (The 60,000kg Fix)
+    fig = Figure(figsize=(10, 6))
+    try:
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        crops = data['labels']
+        ax.set_xticks(range(len(crops)))
+        ax.set_xticklabels(crops, rotation=45, ha='right')
+
+        ax.bar(range(len(crops)), data['values'], color='#6A8D53')
+        ax.set_ylabel("Estimated Yield (Average kg)")
+        ax.set_title("Yield Projections")
+        return _png(fig)
+    finally:
+        fig.clear()
+
+
+def _warm_up():
+    # Pay the matplotlib import once per pool worker, not on its first chart
+    _matplotlib()
+
+
+# name -> (mimetype, file extension, {kind: render function})
+RENDERERS = {
+    'matplotlib': ('image/png', 'png', {'pie': render_pie, 'bar': render_bar}),
+    'svg': ('image/svg+xml', 'svg', {'pie': render_pie_svg, 'bar': render_bar_svg}),
+}
+
+
+class ChartRenderCache:
+    """Bounded LRU of rendered charts keyed by series_key().
+
+    With processes > 0 matplotlib charts render on a process pool: a miss
+    submits every chart of that plan at once, so the pie and bar render in
+    parallel and the browser's second request finds its chart ready.
+    Concurrent requests for the same chart share one render.
+    """
+
+    def __init__(self, max_entries=128, renderer='matplotlib', processes=0):
+        if renderer not in RENDERERS:
+            raise ValueError(f"Unknown chart renderer {renderer!r}; choose from {', '.join(RENDERERS)}")
+        self.max_entries = max_entries
+        self.renderer = renderer
+        self.mimetype, self.extension, self._render_functions = RENDERERS[renderer]
+        # SVG renders in well under a millisecond; a pool would only add IPC
+        self.processes = processes if renderer == 'matplotlib' else 0
+        self._pool = None
+        self._renders = OrderedDict()
+        self._pending = {}
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'renders': 0}
+
+    def key(self, kind, series):
+        return series_key(kind, series, self.renderer)
+
+    def render(self, kind, series):
+        key = self.key(kind, series)
+        future = None
+        with self._lock:
+            data = self._renders.get(key)
+            if data is not None:
+                self._renders.move_to_end(key)
+                self.stats['hits'] += 1
+                return data
+            if self.processes:
+                try:
+                    for other in CHART_KINDS:
+                        self._submit(other, series)
+                    future, pool = self._pending.get(key), self._pool
+                except BrokenProcessPool:
+                    # A worker died while the pool was idle; this request renders in-thread
+                    self._reset_pool()
+
+        if future is not None:
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._pool is pool:  # not one another request already replaced
+                        self._reset_pool()
+
+        with span(f'chart_{kind}'):
+            data = self._render_functions[kind](series[kind])
+        self._store(key, data)
+        return data
+
+    def render_with_fallback(self, kind, series):
+        """(data, mimetype): this renderer's chart, or the SVG one if it fails."""
+        try:
+            return self.render(kind, series), self.mimetype
+        except Exception as e:
+            if self.renderer == 'svg':
+                raise
+            print(f"Chart render failed, serving SVG instead: {e}")
+            count('chart_render_fallback')
+            mimetype, _, functions = RENDERERS['svg']
+            return functions[kind](series[kind]), mimetype
+
+    def _reset_pool(self):
+        """Drop a broken pool; the next miss starts a new one."""
+        print("Chart render pool died, restarting it")
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _submit(self, kind, series):
+        """Start rendering one chart on the pool unless it is cached or in flight."""
+        key = self.key(kind, series)
+        if key in self._renders or key in self._pending:
+            return
+        if self._pool is None:
+            # Not fork: a child forked from a threaded server can inherit locks
+            # held by other threads (logging, sqlite, matplotlib's font cache)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._pool = ProcessPoolExecutor(self.processes, mp_context=context, initializer=_warm_up)
+        started = time.perf_counter()
+        future = self._pool.submit(self._render_functions[kind], series[kind])
+        self._pending[key] = future
+        future.add_done_callback(lambda f: self._finish(key, f, kind, started))
+
+    def _finish(self, key, future, kind, started):
+        # Submit to result, so pool queueing counts too
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=f'chart_{kind}')
+        with self._lock:
+            self._pending.pop(key, None)
+            if not future.cancelled() and future.exception() is None:
+                self._store(key, future.result())
+
+    def _store(self, key, data):
+        with self._lock:
+            self.stats['renders'] += 1
+            self._renders[key] = data
+            self._renders.move_to_end(key)
+            while len(self._renders) > self.max_entries:
+                self._renders.popitem(last=False)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
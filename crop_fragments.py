@@ -0,0 +1,133 @@
+import os
+import re
+import time
+import sqlite3
+from contextlib import closing, contextmanager
+
+
+def parse_yield_range(value):
+    """Turn "60-100 kg" into (60.0, 100.0); a single number gives (n, n)."""
+    nums = re.findall(r'\d+\.?\d*', str(value))
+    if not nums:
+        return None
+    low = float(nums[0])
+    high = float(nums[1]) if len(nums) >= 2 else low
+    return min(low, high), max(low, high)
+
+
+def format_yield_range(low, high):
+    if high >= 10:
+        return f"{low:.0f}-{high:.0f} kg"
+    return f"{low:.1f}-{high:.1f} kg"
+
+
+MONTH_NAMES = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+               'august', 'september', 'october', 'november', 'december']
+# Full names and three-letter abbreviations -> month number
+MONTHS = {name: i for i, name in enumerate(MONTH_NAMES, 1)}
+MONTHS.update({name[:3]: i for i, name in enumerate(MONTH_NAMES, 1)}, sept=9)
+
+
+def parse_month_range(value):
+    """Turn "April - August" into (4, 8); missing months come back as None."""
+    months = [MONTHS[word] for word in re.findall(r'[a-z]+', str(value).lower()) if word in MONTHS]
+    if not months:
+        return None, None
+    return months[0], (months[-1] if len(months) > 1 else None)
+
+
+class CropFragmentStore:
+    """Per-crop advice shared across plans.
+
+    Rows are keyed by (crop, location, garden_type, soil_type, sunlight) and
+    keep the yield normalised per square metre, so a fragment learned from a
+    5 sqm tomato bed can be rescaled for a 12 sqm one.
+    """
+
+    def __init__(self, path, ttl=30 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS crop_fragment ("
+                "crop TEXT NOT NULL, location TEXT NOT NULL, garden_type TEXT NOT NULL, "
+                "soil_type TEXT NOT NULL, sunlight TEXT NOT NULL, "
+                "yield_min_per_sqm REAL NOT NULL, yield_max_per_sqm REAL NOT NULL, "
+                "planting_period TEXT, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (crop, location, garden_type, soil_type, sunlight))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # sqlite3's own context manager only commits; closing() also releases the file
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    @staticmethod
+    def _context(garden_data):
+        return (
+            str(garden_data.get('location', '')).strip().lower(),
+            str(garden_data.get('garden_type', '')),
+            str(garden_data.get('soil_type', '')),
+            str(garden_data.get('sunlight', '')),
+        )
+
+    def lookup(self, garden_data):
+        """Return {crop_name: (estimated_yield, planting_period)} for cached crops,
+        with yields rescaled to each crop's requested area."""
+        context = self._context(garden_data)
+        crops = {c['name'].strip().lower(): c for c in garden_data.get('crops', [])}
+        if not crops:
+            return {}
+
+        placeholders = ",".join("?" * len(crops))
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT crop, yield_min_per_sqm, yield_max_per_sqm, planting_period "
+                    "FROM crop_fragment WHERE location = ? AND garden_type = ? AND soil_type = ? "
+                    f"AND sunlight = ? AND expires_at > ? AND crop IN ({placeholders})",
+                    (*context, time.time(), *crops.keys())
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Crop fragment read error: {e}")
+            return {}
+
+        fragments = {}
+        for crop, low, high, period in rows:
+            requested = crops[crop]
+            area = requested['area']
+            fragments[requested['name']] = (format_yield_range(low * area, high * area), period)
+        return fragments
+
+    def store(self, garden_data, plan_data, crop_names):
+        """Remember the yield and planting period the model gave for crop_names."""
+        context = self._context(garden_data)
+        by_name = {c['name'].strip().lower(): c for c in garden_data.get('crops', [])}
+        yields = {k.strip().lower(): v for k, v in plan_data.get('estimated_yield', {}).items()}
+        periods = {k.strip().lower(): v for k, v in plan_data.get('planting_periods', {}).items()}
+        expires_at = time.time() + self.ttl
+
+        rows = []
+        for name in crop_names:
+            key = name.strip().lower()
+            crop = by_name.get(key)
+            parsed = parse_yield_range(yields.get(key))
+            if not crop or not parsed or crop['area'] <= 0:
+                continue
+            low, high = parsed
+            rows.append((key, *context, low / crop['area'], high / crop['area'], periods.get(key), expires_at))
+
+        if not rows:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO crop_fragment (crop, location, garden_type, soil_type, "
+                    "sunlight, yield_min_per_sqm, yield_max_per_sqm, planting_period, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error as e:
+            print(f"Crop fragment write error: {e}")
@@ -0,0 +1,178 @@
+"""Crop knowledge table: yield ranges, planting months and name aliases.
+
+One table feeds both the yield guidelines in the Gemini prompt and the
+local fallback planner, so the two can no longer drift apart. Everything
+is built once at import; lookups are dict hits and yields for a whole
+garden are computed as one NumPy operation.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from crop_fragments import format_yield_range, MONTH_NAMES
+
+# key: (prompt label, kg per 100 sqm in open ground, kg per 100 sqm in a greenhouse)
+CATEGORIES = {
+    'root': ("Root vegetables (carrots, beets, radishes, parsnips)", (80, 120), (80, 120)),
+    'potato': ("Potatoes", (80, 150), (80, 150)),
+    'tomato': ("Tomatoes", (50, 80), (100, 200)),
+    'cucumber': ("Cucumbers", (30, 50), (80, 150)),
+    'leafy': ("Leafy greens (lettuce, spinach, kale, chard)", (15, 25), (15, 25)),
+    'pepper': ("Peppers (bell, chili)", (30, 50), (30, 50)),
+    'allium': ("Onions, garlic, leeks", (80, 120), (80, 120)),
+    'bean': ("Beans (all types)", (30, 50), (30, 50)),
+    'pea': ("Peas", (20, 40), (20, 40)),
+    'brassica': ("Cabbage, broccoli, cauliflower", (80, 120), (80, 120)),
+    'squash': ("Squash, zucchini", (50, 80), (50, 80)),
+    'melon': ("Melons", (40, 60), (40, 60)),
+    'corn': ("Corn", (20, 30), (20, 30)),
+    'herb': ("Herbs (basil, parsley, cilantro)", (5, 10), (5, 10)),
+}
+# Used for crops the table does not know
+DEFAULT_RANGE = (30, 60)
+
+# (crop, category, sow month, harvest month, aliases) for open ground in a
+# temperate northern-hemisphere season; greenhouses start and finish a month wider
+CROPS = [
+    ('carrot', 'root', 4, 9, []),
+    ('beet', 'root', 4, 9, ['beetroot']),
+    ('radish', 'root', 4, 6, []),
+    ('parsnip', 'root', 4, 11, []),
+    ('turnip', 'root', 4, 9, ['swede', 'rutabaga']),
+    ('potato', 'potato', 4, 9, ['spud']),
+    ('tomato', 'tomato', 5, 9, []),
+    ('cucumber', 'cucumber', 5, 9, ['gherkin']),
+    ('lettuce', 'leafy', 4, 9, []),
+    ('spinach', 'leafy', 3, 6, []),
+    ('kale', 'leafy', 4, 11, []),
+    ('chard', 'leafy', 4, 10, ['swiss chard', 'silverbeet']),
+    ('arugula', 'leafy', 4, 9, ['rocket']),
+    ('pepper', 'pepper', 5, 9, ['bell pepper', 'capsicum', 'chili', 'chilli', 'chile', 'paprika']),
+    ('onion', 'allium', 4, 8, ['scallion', 'spring onion', 'shallot']),
+    ('garlic', 'allium', 10, 7, []),
+    ('leek', 'allium', 4, 11, []),
+    ('bean', 'bean', 5, 9, ['green bean', 'runner bean', 'broad bean', 'fava']),
+    ('pea', 'pea', 3, 7, ['snap pea', 'snow pea', 'mangetout']),
+    ('cabbage', 'brassica', 4, 10, []),
+    ('broccoli', 'brassica', 4, 9, []),
+    ('cauliflower', 'brassica', 4, 10, []),
+    ('brussels sprout', 'brassica', 4, 12, []),
+    ('squash', 'squash', 5, 10, ['pumpkin']),
+    ('zucchini', 'squash', 5, 9, ['courgette', 'marrow']),
+    ('melon', 'melon', 5, 9, ['watermelon', 'cantaloupe']),
+    ('corn', 'corn', 5, 9, ['maize', 'sweetcorn', 'sweet corn']),
+    ('basil', 'herb', 5, 9, []),
+    ('parsley', 'herb', 4, 10, []),
+    ('cilantro', 'herb', 4, 7, ['coriander']),
+    ('dill', 'herb', 4, 8, []),
+]
+
+CATEGORY_KEYS = list(CATEGORIES)
+# Row i of the arrays below is CROPS[i]; the extra last row is the unknown-crop default
+_YIELDS = np.array(
+    [[CATEGORIES[category][1], CATEGORIES[category][2]] for _, category, _, _, _ in CROPS]
+    + [[DEFAULT_RANGE, DEFAULT_RANGE]], dtype=np.float64
+)  # shape (crops + 1, environment, low/high)
+_SOW = np.array([sow for _, _, sow, _, _ in CROPS] + [0])
+_HARVEST = np.array([harvest for _, _, _, harvest, _ in CROPS] + [0])
+UNKNOWN = len(CROPS)
+
+
+def _normalize(name):
+    return " ".join(re.findall(r'[a-z]+', str(name).lower()))
+
+
+def _plurals(word):
+    forms = {word, word + 's', word + 'es'}
+    if word.endswith('y'):
+        forms.add(word[:-1] + 'ies')
+    return forms
+
+
+def _build_aliases():
+    aliases = {}
+    for index, (name, _, _, _, extra) in enumerate(CROPS):
+        for alias in [name] + extra:
+            for form in _plurals(_normalize(alias)):
+                aliases.setdefault(form, index)
+    return aliases
+
+
+# Normalized name, plural or synonym -> row in CROPS
+ALIASES = _build_aliases()
+
+
+@lru_cache(maxsize=4096)
+def match_crop(name):
+    """Row index in CROPS for a user-typed crop name, or UNKNOWN."""
+    key = _normalize(name)
+    if key in ALIASES:
+        return ALIASES[key]
+    # "cherry tomatoes", "purple sprouting broccoli": the last words name the crop
+    words = key.split()
+    for start in range(1, len(words)):
+        tail = " ".join(words[start:])
+        if tail in ALIASES:
+            return ALIASES[tail]
+    return UNKNOWN
+
+
+def crop_category(name):
+    index = match_crop(name)
+    return None if index == UNKNOWN else CROPS[index][1]
+
+
+def estimate_crops(crops, garden_type):
+    """Yield range and planting period strings for every crop of a garden.
+
+    Yields are scaled from kg per 100 sqm to each crop's own area in one
+    vectorized pass; 'both' averages open ground and greenhouse.
+    """
+    if not crops:
+        return {}, {}
+    index = np.array([match_crop(c['name']) for c in crops])
+    area = np.array([float(c['area']) for c in crops])
+
+    if garden_type == 'greenhouse':
+        per_100 = _YIELDS[index, 1]
+    elif garden_type == 'both':
+        per_100 = _YIELDS[index].mean(axis=1)
+    else:
+        per_100 = _YIELDS[index, 0]
+    scaled = per_100 * (area / 100)[:, None]
+
+    # Greenhouses sow a month earlier and harvest a month later
+    widen = 1 if garden_type in ('greenhouse', 'both') else 0
+    sow = (_SOW[index] - 1 - widen) % 12
+    harvest = (_HARVEST[index] - 1 + widen) % 12
+
+    yields, periods = {}, {}
+    for i, crop in enumerate(crops):
+        yields[crop['name']] = format_yield_range(scaled[i, 0], scaled[i, 1])
+        if index[i] == UNKNOWN:
+            periods[crop['name']] = "Sow after the last frost, harvest before the first frost"
+        else:
+            periods[crop['name']] = f"{MONTH_NAMES[sow[i]].title()} - {MONTH_NAMES[harvest[i]].title()}"
+    return yields, periods
+
+
+def yield_guidelines(categories=None, garden_type=None):
+    """Prompt yield guideline rows, for all categories or only the given ones.
+
+    A garden_type of 'open_ground' or 'greenhouse' keeps only that
+    environment's row for crops whose ranges differ.
+    """
+    lines = []
+    for key in CATEGORY_KEYS:
+        if categories is not None and key not in categories:
+            continue
+        label, open_ground, greenhouse = CATEGORIES[key]
+        if open_ground == greenhouse:
+            lines.append(f"- {label}: {open_ground[0]}-{open_ground[1]} kg")
+            continue
+        if garden_type != 'greenhouse':
+            lines.append(f"- {label} (field/open ground): {open_ground[0]}-{open_ground[1]} kg")
+        if garden_type != 'open_ground':
+            lines.append(f"- {label} (greenhouse): {greenhouse[0]}-{greenhouse[1]} kg")
+    return lines
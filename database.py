@@ -1,3 +1,63 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database and mode."""
+    if not config.get('DB_PRODUCTION'):
+        return {}
+    options = {
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_pre_ping': True,
+    }
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # SQLite has a single writer: a few connections with no overflow make
+        # threads queue fairly in the pool instead of spinning in busy_timeout
+        options.update(pool_size=config['SQLITE_POOL_SIZE'], max_overflow=0)
+        options['connect_args'] = {
+            'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000,
+            'check_same_thread': False,
+        }
+    else:
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_recycle=config['DB_POOL_RECYCLE']
+        )
+    return options
+
+
+def enable_sqlite_pragmas(engine, busy_timeout_ms=5000, mmap_size=268435456, cache_size_kb=65536):
+    """Put every new SQLite connection in WAL mode with production pragmas."""
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL: readers never block the writer; with synchronous=NORMAL commits skip the fsync
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        cursor.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+        cursor.execute(f'PRAGMA cache_size=-{int(cache_size_kb)}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.close()
+
+
+def init_database(app):
+    """db.init_app with the pool and SQLite settings from the app config."""
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config), **app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    }
+    db.init_app(app)
+
+    if app.config.get('DB_PRODUCTION') and app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        with app.app_context():
+            enable_sqlite_pragmas(
+                db.engine,
+                busy_timeout_ms=app.config['SQLITE_BUSY_TIMEOUT_MS'],
+                mmap_size=app.config['SQLITE_MMAP_SIZE'],
+                cache_size_kb=app.config['SQLITE_CACHE_SIZE_KB']
+            )
@@ -0,0 +1,350 @@
+import os
+import re
+import asyncio
+import time
+import random
+import sqlite3
+import threading
+from contextlib import closing
+
+try:
+    import httpx
+except ImportError:  # google-genai brings it; only needed to classify its errors
+    httpx = None
+
+from metrics import span, STAGE_SECONDS
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class RateBudgetExceeded(Exception):
+    """Raised when waiting for the request/token budget would take too long."""
+
+
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+# Gemini was not reached or did not answer in time: retry, and count against the breaker
+TRANSPORT_ERRORS = (ConnectionError, TimeoutError) + ((httpx.TransportError,) if httpx else ())
+
+
+def error_code(exc):
+    code = getattr(exc, 'code', None)
+    if isinstance(code, int):
+        return code
+    text = str(exc)
+    if '429' in text or 'RESOURCE_EXHAUSTED' in text:
+        return 429
+    return None
+
+
+def retry_after_seconds(exc):
+    """Best-effort server hint for how long to wait before retrying."""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        value = headers.get('retry-after')
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    details = getattr(exc, 'details', None)
+    if isinstance(details, dict):
+        for item in details.get('error', {}).get('details', []) or []:
+            if str(item.get('@type', '')).endswith('RetryInfo'):
+                match = re.match(r'([\d.]+)s', str(item.get('retryDelay', '')))
+                if match:
+                    return float(match.group(1))
+
+    match = re.search(r'retry in ([\d.]+)s', str(exc), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Token bucket refilled at capacity/period.
+
+    With a path the bucket state lives in a SQLite file so every worker
+    process on the host draws from the same budget; without one it is
+    shared by the threads of this process only.
+    """
+
+    def __init__(self, name, capacity, period=60.0, path=None):
+        self.name = name
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.path = path
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated_at = time.time()
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS token_bucket ("
+                    "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+
+    def _take(self, amount):
+        """Take amount tokens if available; return 0 or the seconds to wait."""
+        amount = min(float(amount), self.capacity)
+        now = time.time()
+
+        if not self.path:
+            with self._lock:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return 0
+                return (amount - self._tokens) / self.rate
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM token_bucket WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.rate)
+            wait = 0
+            if tokens >= amount:
+                tokens -= amount
+            else:
+                wait = (amount - tokens) / self.rate
+            conn.execute(
+                "INSERT OR REPLACE INTO token_bucket (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, tokens, now)
+            )
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+    def acquire(self, amount=1, max_wait=30.0):
+        deadline = time.time() + max_wait
+        while True:
+            wait = self._take(amount)
+            if wait == 0:
+                return
+            if time.time() + wait > deadline:
+                raise RateBudgetExceeded(f"{self.name} budget exhausted")
+            time.sleep(wait)
+
+    async def aacquire(self, amount=1, max_wait=30.0):
+        deadline = time.time() + max_wait
+        while True:
+            # The shared bucket can wait up to 10s on the SQLite lock; keep that off the loop
+            wait = await asyncio.to_thread(self._take, amount) if self.path else self._take(amount)
+            if wait == 0:
+                return
+            if time.time() + wait > deadline:
+                raise RateBudgetExceeded(f"{self.name} budget exhausted")
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and lets a single trial
+    call through once `reset_timeout` seconds have passed."""
+
+    def __init__(self, threshold=5, reset_timeout=60.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half_open' and self._trial_running):
+                raise CircuitOpenError("Gemini is unavailable, failing fast")
+            if state == 'half_open':
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def cancel_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = time.time()
+            self._trial_running = False
+
+
+class GeminiClient:
+    """Wraps client.models.generate_content with a shared RPM/TPM budget,
+    exponential backoff with jitter and a circuit breaker."""
+
+    def __init__(self, client, rpm=15, tpm=250000, bucket_path=None, max_attempts=3,
+                 backoff_base=2.0, backoff_max=60.0, max_wait=30.0,
+                 breaker_threshold=5, breaker_reset=60.0, expected_output_tokens=1500):
+        self.client = client
+        self.requests = TokenBucket('gemini_rpm', rpm, path=bucket_path)
+        self.tokens = TokenBucket('gemini_tpm', tpm, path=bucket_path)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self.expected_output_tokens = expected_output_tokens
+        self.stats = {'calls': 0, 'retries': 0, 'rate_limited': 0, 'circuit_rejections': 0, 'errors': 0}
+
+    def estimate_tokens(self, contents):
+        # ~4 characters per token for English prompts
+        return len(str(contents)) // 4 + self.expected_output_tokens
+
+    def backoff_delay(self, attempt, exc):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        hint = retry_after_seconds(exc)
+        if hint is not None:
+            delay = max(delay, hint)
+        return delay
+
+    def _check_breaker(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.stats['circuit_rejections'] += 1
+            raise
+
+    def _retry_delay(self, attempt, exc):
+        """Record a failed call; return seconds to wait before retrying, or
+        None when the error should be raised."""
+        self.stats['errors'] += 1
+        code = error_code(exc)
+        if code is not None and 400 <= code < 500 and code not in RETRYABLE_CODES:
+            # The upstream answered, it just rejected this request
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if code == 429:
+            self.stats['rate_limited'] += 1
+        if code not in RETRYABLE_CODES and not isinstance(exc, TRANSPORT_ERRORS):
+            return None
+        if attempt + 1 >= self.max_attempts or self.breaker.state == 'open':
+            return None
+        delay = self.backoff_delay(attempt, exc)
+        if delay > self.max_wait:
+            return None
+        self.stats['retries'] += 1
+        reason = f"returned {code}" if code else f"unreachable ({type(exc).__name__})"
+        print(f"Gemini {reason}. Retrying in {delay:.1f}s...")
+        return delay
+
+    def generate_content(self, model, contents, config=None):
+        for attempt in range(self.max_attempts):
+            self._check_breaker()
+            try:
+                with span('gemini_budget_wait'):
+                    self.requests.acquire(1, max_wait=self.max_wait)
+                    self.tokens.acquire(self.estimate_tokens(contents), max_wait=self.max_wait)
+            except RateBudgetExceeded:
+                self.breaker.cancel_trial()
+                raise
+
+            try:
+                self.stats['calls'] += 1
+                with span('gemini_attempt'):
+                    response = self.client.models.generate_content(model=model, contents=contents, config=config)
+                self.breaker.record_success()
+                return response
+            except Exception as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                with span('gemini_backoff'):
+                    time.sleep(delay)
+
+    def generate_content_stream(self, model, contents, config=None):
+        """Streaming generate_content under the same budget and breaker;
+        yields response chunks.
+
+        Retries only happen before the first chunk arrives: a stream that
+        breaks halfway raises, since its text has already been handed out.
+        """
+        for attempt in range(self.max_attempts):
+            self._check_breaker()
+            try:
+                with span('gemini_budget_wait'):
+                    self.requests.acquire(1, max_wait=self.max_wait)
+                    self.tokens.acquire(self.estimate_tokens(contents), max_wait=self.max_wait)
+            except RateBudgetExceeded:
+                self.breaker.cancel_trial()
+                raise
+
+            received = False
+            started = time.perf_counter()
+            try:
+                self.stats['calls'] += 1
+                for chunk in self.client.models.generate_content_stream(model=model, contents=contents, config=config):
+                    if not received:
+                        received = True
+                        STAGE_SECONDS.observe(time.perf_counter() - started, stage='gemini_first_chunk')
+                    yield chunk
+                self.breaker.record_success()
+                # Includes the time the consumer spent between chunks
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage='gemini_stream')
+                return
+            except GeneratorExit:
+                # The consumer went away (browser closed); the upstream was fine
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                delay = None if received else self._retry_delay(attempt, e)
+                if delay is None:
+                    if received:
+                        self.breaker.record_failure()
+                    raise
+                with span('gemini_backoff'):
+                    time.sleep(delay)
+
+    async def agenerate_content(self, model, contents, config=None, client=None):
+        """Same policy as generate_content, on the SDK's aio client.
+
+        Pass a client created for the running event loop when the wrapped
+        one may already be bound to another loop.
+        """
+        client = client or self.client
+        for attempt in range(self.max_attempts):
+            self._check_breaker()
+            try:
+                with span('gemini_budget_wait'):
+                    await self.requests.aacquire(1, max_wait=self.max_wait)
+                    await self.tokens.aacquire(self.estimate_tokens(contents), max_wait=self.max_wait)
+            except RateBudgetExceeded:
+                self.breaker.cancel_trial()
+                raise
+
+            try:
+                self.stats['calls'] += 1
+                with span('gemini_attempt'):
+                    response = await client.aio.models.generate_content(model=model, contents=contents, config=config)
+                self.breaker.record_success()
+                return response
+            except Exception as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                with span('gemini_backoff'):
+                    await asyncio.sleep(delay)
@@ -0,0 +1,201 @@
+"""Local stand-in for the Gemini REST API.
+
+Serves generateContent, streamGenerateContent and countTokens for any
+model with a plan built from the crops in the prompt, so the app can run
+offline. Latency and 429 responses can be injected to exercise the
+client's backoff and circuit breaker; streamed answers arrive in chunks
+spread over the latency:
+
+    python gemini_stub.py --port 8765 --latency 1.5 --error-rate 0.2
+    GEMINI_BASE_URL=http://127.0.0.1:8765 python app.py
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_crops(text):
+    return [(name.strip(), float(area)) for name, area in re.findall(r'([^,(]+?)\s*\(([\d.]+)\s*sqm\)', text)]
+
+
+def response_for_prompt(prompt):
+    """Plan JSON for a single-garden prompt, or {"plans": [...]} for a packed one."""
+    if 'GARDEN 1:' in prompt:
+        return {"plans": [
+            plan_for_prompt(prompt, parse_crops(crops))
+            for crops in re.findall(r'- Crops:\s*(.+)', prompt)
+        ]}
+    match = re.search(r'CROPS TO PLAN:\s*(.+)', prompt)
+    return plan_for_prompt(prompt, parse_crops(match.group(1)) if match else [])
+
+
+def plan_for_prompt(prompt, crops):
+    """Deterministic plan JSON for the given (name, area) crops."""
+    only = re.search(r'ONLY include estimated_yield and planting_periods entries for:\s*(.+)', prompt)
+    skip_yields = 'DO NOT include estimated_yield' in prompt
+    yield_names = {n.strip() for n in only.group(1).split(',')} if only else None
+
+    estimated_yield, planting_periods = {}, {}
+    for name, area in crops:
+        if skip_yields or (yield_names is not None and name not in yield_names):
+            continue
+        estimated_yield[name] = f"{area * 0.5:.0f}-{area * 0.9:.0f} kg"
+        planting_periods[name] = "April - August"
+
+    return {
+        "optimized_layout": {
+            "crop_distribution": {name: "0%" for name, _ in crops},
+            "spatial_arrangement": "Tall crops on the north side, low crops in front.",
+            "companion_planting": ["Basil with tomatoes", "Keep onions away from beans"],
+            "crop_rotation": "Rotate families yearly: legumes, leaves, fruits, roots."
+        },
+        "estimated_yield": estimated_yield,
+        "planting_periods": planting_periods,
+        "smart_advice": {
+            "irrigation": "Drip irrigate early in the morning, 2-3 times per week.",
+            "soil_management": "Work in compost before sowing and mulch after.",
+            "local_risks": "Watch for late frosts and summer heat waves.",
+            "pest_prevention": "Row covers and companion flowers."
+        },
+        "additional_tips": ["Label rows", "Keep a garden journal", "Harvest often"]
+    }
+
+
+class StubState:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, retry_after=2):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'rate_limited': 0}
+
+
+def make_handler(state):
+    class GeminiStubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith('/stats'):
+                with state.lock:
+                    return self._send_json(200, dict(state.counts))
+            self._send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            prompt = " ".join(
+                part.get('text', '')
+                for content in request.get('contents', [])
+                for part in content.get('parts', [])
+            )
+
+            if ':countTokens' in self.path:
+                return self._send_json(200, {'totalTokens': len(prompt) // 4})
+            streaming = ':streamGenerateContent' in self.path
+            if ':generateContent' not in self.path and not streaming:
+                return self._send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+
+            with state.lock:
+                state.counts['requests'] += 1
+                limited = random.random() < state.error_rate
+                if limited:
+                    state.counts['rate_limited'] += 1
+
+            latency = max(0.0, state.latency + random.uniform(-state.jitter, state.jitter))
+            if not streaming or limited:
+                time.sleep(latency)
+
+            if limited:
+                return self._send_json(429, {'error': {
+                    'code': 429,
+                    'message': 'Resource has been exhausted (e.g. check quota).',
+                    'status': 'RESOURCE_EXHAUSTED',
+                    'details': [{
+                        '@type': 'type.googleapis.com/google.rpc.RetryInfo',
+                        'retryDelay': f'{state.retry_after}s'
+                    }]
+                }}, headers={'Retry-After': str(state.retry_after)})
+
+            text = json.dumps(response_for_prompt(prompt), indent=1)
+            if streaming:
+                return self._stream(prompt, text, latency)
+            self._send_json(200, {
+                'candidates': [{
+                    'content': {'parts': [{'text': text}], 'role': 'model'},
+                    'finishReason': 'STOP',
+                    'index': 0
+                }],
+                'usageMetadata': {
+                    'promptTokenCount': len(prompt) // 4,
+                    'candidatesTokenCount': len(text) // 4,
+                    'totalTokenCount': (len(prompt) + len(text)) // 4
+                }
+            })
+
+        def _stream(self, prompt, text, latency, pieces=16):
+            """Answer as SSE chunks spread evenly over the latency, like a model generating."""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            size = -(-len(text) // pieces)
+            for start in range(0, len(text), size):
+                time.sleep(latency / pieces)
+                chunk = {'candidates': [{'content': {'parts': [{'text': text[start:start + size]}], 'role': 'model'}, 'index': 0}]}
+                if start + size >= len(text):
+                    chunk['candidates'][0]['finishReason'] = 'STOP'
+                    chunk['usageMetadata'] = {
+                        'promptTokenCount': len(prompt) // 4,
+                        'candidatesTokenCount': len(text) // 4,
+                        'totalTokenCount': (len(prompt) + len(text)) // 4
+                    }
+                self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode('utf-8'))
+                self.wfile.flush()
+            self.close_connection = True
+
+    return GeminiStubHandler
+
+
+def start_stub_server(host='127.0.0.1', port=0, **options):
+    """Start the stub in a daemon thread and return (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(StubState(**options)))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every call')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+/- seconds of random latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with 429')
+    parser.add_argument('--retry-after', type=int, default=2, help='Retry-After seconds sent with a 429')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StubState(
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, retry_after=args.retry_after
+    )))
+    print(f"Gemini stub listening on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -4,20 +4,13 @@ import sys
 # Add the current directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
-from config import Config
+from app import create_app, init_db, db
 
 def initialize_database():
-    """Initialize the database and create tables"""
-    with app.app_context():
-        # Create data directory if it doesn't exist
-        data_dir = os.path.join(Config.BASE_DIR, 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # Create all tables
-        db.create_all()
-        print(f"Database created at: {os.path.join(data_dir, 'garden.db')}")
-        print("Database initialized successfully!")
+    """Initialize the database: tables, missing columns and the data directory"""
+    with create_app().app_context():
+        init_db()
+        print(f"Database: {db.engine.url.render_as_string(hide_password=True)}")
 
 if __name__ == '__main__':
     initialize_database()
\ No newline at end of file
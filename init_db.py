@@ -1,5 +1,4 @@
-from app import app, db
+from app import create_app, init_db
 
-with app.app_context():
-    db.create_all()
-    print("Database created!")
\ No newline at end of file
+with create_app().app_context():
+    init_db()
@@ -0,0 +1,129 @@
+import uuid
+import asyncio
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from database import db
+from models import GardenPlan, PlanJob
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds its maximum of pending jobs."""
+
+
+class PlanJobQueue:
+    """Bounded background pool that runs generate_plan outside request threads.
+
+    Job state lives in the PlanJob table so any worker process can answer a
+    status poll; the generation itself (including the 429 retry sleeps) runs
+    on this pool's threads, or with use_async on a single event loop thread
+    through agenerate_plan.
+    """
+
+    def __init__(self, app, generator, max_workers=4, max_pending=32, use_async=False):
+        self.app = app
+        self.generator = generator
+        self.max_pending = max_pending
+        self.use_async = use_async
+        self._pending = 0
+        self._lock = threading.Lock()
+        if use_async:
+            # One event loop thread holds every in-flight Gemini call; the
+            # concurrency bound is the generator's async semaphore.
+            self._loop = asyncio.new_event_loop()
+            self._loop_thread = threading.Thread(target=self._loop.run_forever, name='plan-job-loop', daemon=True)
+            self._loop_thread.start()
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='plan-job')
+
+    def submit(self, user_id, garden_data):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Too many plans are being generated right now")
+            self._pending += 1
+
+        try:
+            job = PlanJob(id=uuid.uuid4().hex, user_id=user_id, status='queued')
+            db.session.add(job)
+            db.session.commit()
+            job_id = job.id
+            if self.use_async:
+                asyncio.run_coroutine_threadsafe(self._arun(job_id, user_id, garden_data), self._loop)
+            else:
+                self._executor.submit(self._run, job_id, user_id, garden_data)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id, user_id, garden_data):
+        try:
+            self._mark_running(job_id)
+            try:
+                ai_plan = self.generator.generate_plan(garden_data)
+                self._save(job_id, user_id, garden_data, ai_plan)
+            except Exception as e:
+                print(traceback.format_exc())
+                self._fail(job_id, e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def _arun(self, job_id, user_id, garden_data):
+        try:
+            await asyncio.to_thread(self._mark_running, job_id)
+            try:
+                ai_plan = await self.generator.agenerate_plan(garden_data)
+                await asyncio.to_thread(self._save, job_id, user_id, garden_data, ai_plan)
+            except Exception as e:
+                print(traceback.format_exc())
+                await asyncio.to_thread(self._fail, job_id, e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _mark_running(self, job_id):
+        with self.app.app_context():
+            self._set_status(job_id, 'running')
+            db.session.remove()
+
+    def _save(self, job_id, user_id, garden_data, ai_plan):
+        with self.app.app_context():
+            try:
+                plan = GardenPlan.from_generated(user_id, garden_data, ai_plan)
+                db.session.add(plan)
+                db.session.flush()
+
+                job = db.session.get(PlanJob, job_id)
+                job.status = 'done'
+                job.plan_id = plan.id
+                job.is_fallback = bool(ai_plan.get('is_fallback'))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _fail(self, job_id, error):
+        with self.app.app_context():
+            self._set_status(job_id, 'failed', error=str(error))
+            db.session.remove()
+
+    def _set_status(self, job_id, status, error=None):
+        job = db.session.get(PlanJob, job_id)
+        if job is None:
+            return
+        job.status = status
+        job.error = error
+        db.session.commit()
+
+    def shutdown(self, wait=True):
+        if self.use_async:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if wait:
+                self._loop_thread.join()
+        else:
+            self._executor.shutdown(wait=wait)
@@ -0,0 +1,175 @@
+"""In-process counters and latency histograms in the Prometheus text format.
+
+Recording is a lock, a bisect and two additions; nothing is formatted
+until /metrics is scraped. The stats dicts the caches and the Gemini
+client already keep are read at scrape time through register_stats(), so
+they cost nothing extra per request. Values are per process: with several
+workers, scrape each one or run a single worker per scrape target.
+"""
+import time
+import threading
+from bisect import bisect_left
+
+# Seconds; wide enough for a full Gemini call, fine enough for a DB commit
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f'{self.name}{_labels(self.labelnames, key)} {_number(value)}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        """Context manager that observes the seconds spent inside it."""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = _labels(self.labelnames, key, [('le', _number(bound))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._stats = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_stats(self, name, documentation, source):
+        """Expose a component's stats dict as one counter with a 'kind' label.
+
+        source is called at scrape time and returns the dict (or None when
+        the component is disabled).
+        """
+        with self._lock:
+            self._stats = [entry for entry in self._stats if entry[0] != name]
+            self._stats.append((name, documentation, source))
+
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+            stats = list(self._stats)
+        for _, metric in metrics:
+            lines.extend(metric.render())
+        for name, documentation, source in stats:
+            values = source()
+            if values is None:
+                continue
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} counter')
+            for kind, value in sorted(dict(values).items()):
+                lines.append(f'{name}{_labels(("kind",), (kind,))} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'garden_stage_seconds', 'Seconds spent in each stage of plan generation', ('stage',)
+)
+EVENTS = REGISTRY.counter(
+    'garden_events_total', 'Plan generation events: fallbacks, errors, cache hits', ('event',)
+)
+
+
+def span(stage):
+    """with span('db_commit'): ... records the block's duration under that stage."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def count(event, amount=1):
+    EVENTS.inc(amount, event=event)
@@ -0,0 +1,137 @@
+"""Schema and data migrations.
+
+upgrade_schema() runs from "flask --app app init-db" (or init_db.py /
+init.py), not on startup, and only adds what is missing (new nullable
+columns). Run it after deploying a release with new columns. Data moves
+are explicit:
+
+    python migrations.py charts     # move base64 chart PNGs into the chart store
+    python migrations.py crops      # fill plan_crop rows for older plans
+"""
+import sys
+import json
+import base64
+
+from sqlalchemy import inspect, text
+
+from database import db
+
+
+def upgrade_schema():
+    """Add columns and indexes that exist on the models but not yet in the database."""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            print(f"Added column {table.name}.{column.name}")
+        
+        existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
+                print(f"Added index {index.name}")
+
+
+def move_plan_charts(plan, store):
+    """Move one plan's inline base64 charts into the store (caller commits)."""
+    if plan.pie_chart_image:
+        plan.pie_chart_hash = store.put(base64.b64decode(plan.pie_chart_image))
+    if plan.bar_chart_image:
+        plan.bar_chart_hash = store.put(base64.b64decode(plan.bar_chart_image))
+    plan.pie_chart_image = None
+    plan.bar_chart_image = None
+
+
+def migrate_chart_blobs(batch_size=100):
+    """Move inline base64 chart images into the content-addressed store."""
+    from flask import current_app
+    from chart_store import ChartStore
+    from models import GardenPlan
+
+    store = ChartStore(current_app.config['CHART_STORE_DIR'])
+    moved = 0
+    while True:
+        plans = (GardenPlan.query
+                 .filter((GardenPlan.pie_chart_image.isnot(None)) | (GardenPlan.bar_chart_image.isnot(None)))
+                 .options(db.undefer(GardenPlan.pie_chart_image), db.undefer(GardenPlan.bar_chart_image))
+                 .limit(batch_size)
+                 .all())
+        if not plans:
+            break
+        for plan in plans:
+            move_plan_charts(plan, store)
+        db.session.commit()
+        moved += len(plans)
+        print(f"Moved charts for {moved} plans...")
+
+    if db.engine.dialect.name == 'sqlite':
+        # Give the freed pages back to the filesystem
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM'))
+    print(f"Chart migration done: {moved} plans updated.")
+    return moved
+
+
+def _loads(value):
+    try:
+        return json.loads(value or '{}')
+    except ValueError:
+        return {}
+
+
+def migrate_plan_crops(batch_size=200):
+    """Create typed plan_crop rows from the JSON columns of plans that have none."""
+    from models import GardenPlan, PlanCrop
+
+    filled = 0
+    last_id = 0
+    while True:
+        plans = (GardenPlan.query
+                 .filter(GardenPlan.id > last_id, ~GardenPlan.crops.any())
+                 .options(db.undefer_group('details'))
+                 .order_by(GardenPlan.id)
+                 .limit(batch_size)
+                 .all())
+        if not plans:
+            break
+        for plan in plans:
+            crops = _loads(plan.crop_data)
+            if isinstance(crops, list):
+                plan.crops = PlanCrop.from_plan(
+                    [c for c in crops if isinstance(c, dict) and 'name' in c and 'area' in c],
+                    _loads(plan.estimated_yield),
+                    _loads(plan.planting_periods)
+                )
+        db.session.commit()
+        last_id = plans[-1].id
+        filled += len(plans)
+        print(f"Filled crops for {filled} plans...")
+
+    print(f"Crop migration done: {filled} plans checked.")
+    return filled
+
+
+MIGRATIONS = {
+    'charts': migrate_chart_blobs,
+    'crops': migrate_plan_crops,
+}
+
+if __name__ == '__main__':
+    from app import create_app
+
+    names = sys.argv[1:] or list(MIGRATIONS)
+    with create_app().app_context():
+        upgrade_schema()
+        for name in names:
+            if name not in MIGRATIONS:
+                sys.exit(f"Unknown migration {name!r}; choose from {', '.join(MIGRATIONS)}")
+            MIGRATIONS[name]()
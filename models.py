@@ -1,6 +1,30 @@
 from database import db
 from flask_login import UserMixin
 from datetime import datetime
+import json
+
+from crop_fragments import parse_yield_range, parse_month_range
+
+# Columns shown in plan listings; everything else stays in the database
+SUMMARY_COLUMNS = ('id', 'plan_name', 'garden_type', 'location', 'garden_size', 'soil_type', 'sunlight', 'created_at')
+
+def plan_summary(plan):
+    """Listing dict for a GardenPlan or a row projected on SUMMARY_COLUMNS."""
+    return {
+        'id': plan.id,
+        'plan_name': plan.plan_name,
+        'garden_type': plan.garden_type,
+        'location': plan.location,
+        'garden_size': plan.garden_size,
+        'soil_type': plan.soil_type,
+        'sunlight': plan.sunlight,
+        'created_at': plan.created_at.strftime('%Y-%m-%d %H:%M')
+    }
+
+def parse_plan_cursor(cursor):
+    """Split a "<created_at>_<id>" listing cursor; raises ValueError if malformed."""
+    created_at, _, plan_id = cursor.rpartition('_')
+    return datetime.fromisoformat(created_at), int(plan_id)
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -14,6 +38,11 @@ class User(UserMixin, db.Model):
 
 class GardenPlan(db.Model):
     # ... keep this exactly as is, no changes needed ...
+    __table_args__ = (
+        # Serves the account listing: WHERE user_id = ? ORDER BY created_at
+        db.Index('ix_garden_plan_user_created', 'user_id', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     plan_name = db.Column(db.String(200), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -27,24 +56,146 @@ class GardenPlan(db.Model):
     main_goal = db.Column(db.String(100))
     pest_prevention = db.Column(db.Boolean, default=False)
     
-    crop_data = db.Column(db.Text)
-    optimized_layout = db.Column(db.Text)
-    estimated_yield = db.Column(db.Text)
-    planting_periods = db.Column(db.Text)
-    smart_advice = db.Column(db.Text)
+    # JSON bodies, loaded together on first access (or with undefer_group('details'))
+    crop_data = db.deferred(db.Column(db.Text), group='details')
+    optimized_layout = db.deferred(db.Column(db.Text), group='details')
+    estimated_yield = db.deferred(db.Column(db.Text), group='details')
+    planting_periods = db.deferred(db.Column(db.Text), group='details')
+    smart_advice = db.deferred(db.Column(db.Text), group='details')
+    
+    # Legacy base64 PNGs, moved to the chart store by `python migrations.py charts`
+    pie_chart_image = db.deferred(db.Column(db.Text))
+    bar_chart_image = db.deferred(db.Column(db.Text))
+    
+    # SHA-256 of the PNG in the content-addressed chart store
+    pie_chart_hash = db.Column(db.String(64))
+    bar_chart_hash = db.Column(db.String(64))
+    
+    # JSON numbers behind the charts; images are rendered on request
+    chart_series = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Typed per-crop rows, written with the plan
+    crops = db.relationship('PlanCrop', backref='plan', lazy=True, cascade='all, delete-orphan')
+    
+    @classmethod
+    def from_generated(cls, user_id, garden_data, ai_plan):
+        """Build an unsaved plan row from form data and a generator result."""
+        return cls(
+            plan_name=f"Plan for {garden_data['location']}",
+            user_id=user_id,
+            location=garden_data['location'],
+            garden_type=garden_data['garden_type'],
+            garden_size=garden_data['garden_size'],
+            soil_type=garden_data['soil_type'],
+            sunlight=garden_data['sunlight'],
+            watering_frequency=garden_data['watering_frequency'],
+            main_goal=garden_data['main_goal'],
+            pest_prevention=garden_data['pest_prevention'],
+            crop_data=json.dumps(garden_data['crops']),
+            optimized_layout=json.dumps(ai_plan.get('optimized_layout', {})),
+            estimated_yield=json.dumps(ai_plan.get('estimated_yield', {})),
+            planting_periods=json.dumps(ai_plan.get('planting_periods', {})),
+            smart_advice=json.dumps(ai_plan.get('smart_advice', {})),
+            chart_series=json.dumps(ai_plan['chart_series']) if ai_plan.get('chart_series') else None,
+            crops=PlanCrop.from_plan(garden_data['crops'], ai_plan.get('estimated_yield'), ai_plan.get('planting_periods'))
+        )
+    
+    @classmethod
+    def summaries_for_user(cls, user_id, cursor=None, limit=20):
+        """One page of a user's plans, newest first, reading only SUMMARY_COLUMNS.
+        
+        Keyset pagination on (created_at, id): cursor is the value returned
+        for the previous page. Returns (summaries, next_cursor), with
+        next_cursor None on the last page.
+        """
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        query = db.session.query(*[getattr(cls, c) for c in SUMMARY_COLUMNS]).filter(cls.user_id == user_id)
+        if cursor:
+            created_at, plan_id = parse_plan_cursor(cursor)
+            query = query.filter(db.or_(
+                cls.created_at < created_at,
+                db.and_(cls.created_at == created_at, cls.id < plan_id)
+            ))
+        rows = query.order_by(cls.created_at.desc(), cls.id.desc()).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1].created_at.isoformat()}_{rows[-1].id}"
+        return [plan_summary(row) for row in rows], next_cursor
+    
+    def to_dict(self):
+        return plan_summary(self)
+
+class PlanCrop(db.Model):
+    """One crop of a plan with numeric yield and months, so totals and charts
+    are SQL aggregates instead of re-parsing JSON strings."""
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey('garden_plan.id'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    area = db.Column(db.Float, nullable=False)
+    yield_min_kg = db.Column(db.Float)
+    yield_max_kg = db.Column(db.Float)
+    sow_month = db.Column(db.Integer)
+    harvest_month = db.Column(db.Integer)
+    
+    @classmethod
+    def from_plan(cls, crops, estimated_yield, planting_periods):
+        """Unsaved rows for a plan's crops; yields and periods are matched by name, ignoring case."""
+        yields = {k.strip().lower(): v for k, v in (estimated_yield or {}).items()}
+        periods = {k.strip().lower(): v for k, v in (planting_periods or {}).items()}
+        rows = []
+        for crop in crops:
+            key = crop['name'].strip().lower()
+            yield_range = parse_yield_range(yields[key]) if key in yields else None
+            sow_month, harvest_month = parse_month_range(periods.get(key, ''))
+            rows.append(cls(
+                name=crop['name'],
+                area=crop['area'],
+                yield_min_kg=yield_range[0] if yield_range else None,
+                yield_max_kg=yield_range[1] if yield_range else None,
+                sow_month=sow_month,
+                harvest_month=harvest_month
+            ))
+        return rows
     
-    pie_chart_image = db.Column(db.Text)
-    bar_chart_image = db.Column(db.Text)
+    @classmethod
+    def totals_for_user(cls, user_id):
+        """Area and yield range per crop across all of a user's plans, in one query."""
+        rows = (db.session.query(
+                    db.func.min(cls.name).label('name'),
+                    db.func.count(db.distinct(cls.plan_id)).label('plans'),
+                    db.func.sum(cls.area).label('area'),
+                    db.func.sum(cls.yield_min_kg).label('yield_min_kg'),
+                    db.func.sum(cls.yield_max_kg).label('yield_max_kg'))
+                .join(GardenPlan, GardenPlan.id == cls.plan_id)
+                .filter(GardenPlan.user_id == user_id)
+                .group_by(db.func.lower(cls.name))
+                .order_by(db.func.sum(cls.area).desc())
+                .all())
+        return [row._asdict() for row in rows]
+
+class PlanJob(db.Model):
+    """Background plan-generation request, shared by all workers via the DB."""
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    plan_id = db.Column(db.Integer, db.ForeignKey('garden_plan.id'))
+    error = db.Column(db.Text)
+    is_fallback = db.Column(db.Boolean, default=False)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
         return {
             'id': self.id,
-            'plan_name': self.plan_name,
-            'location': self.location,
-            'garden_size': self.garden_size,
-            'soil_type': self.soil_type,
-            'sunlight': self.sunlight,
+            'status': self.status,
+            'plan_id': self.plan_id,
+            'error': self.error,
+            'is_fallback': self.is_fallback,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M')
         }
\ No newline at end of file
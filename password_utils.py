@@ -1,5 +1,71 @@
 # password_utils.py
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusyError(Exception):
+    """Raised instead of queueing when the password hasher is at its queue limit."""
+
+
+class PasswordHasher:
+    """Password hashing and checks on a small dedicated thread pool.
+
+    scrypt and PBKDF2 release the GIL, so max_workers bounds how many cores
+    logins can take from plan requests. At most max_queue hashes wait or
+    run at once; past that, calls raise HasherBusyError (a 503) instead of
+    piling up. method is a werkzeug method string such as
+    'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'; stored hashes made with
+    other parameters are reported by needs_rehash().
+    """
+
+    def __init__(self, method='scrypt:32768:8:1', max_workers=2, max_queue=16):
+        self.method = method
+        self.max_queue = max_queue
+        # The parameters werkzeug writes for this method, e.g. 'scrypt' -> 'scrypt:32768:8:1'
+        self.prefix = generate_password_hash('', method).split('$', 1)[0]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.stats = {'hashes': 0, 'checks': 0, 'rehashes': 0, 'rejected': 0}
+
+    def _run(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.stats['rejected'] += 1
+                raise HasherBusyError("Too many sign-ins right now")
+            self._pending += 1
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def hash(self, password):
+        with self._lock:
+            self.stats['hashes'] += 1
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, password_hash, password):
+        with self._lock:
+            self.stats['checks'] += 1
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    def rehash(self, password):
+        """hash() for upgrading a stored hash, counted under rehashes."""
+        new_hash = self.hash(password)
+        with self._lock:
+            self.stats['rehashes'] += 1
+        return new_hash
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
 
 def validate_password_strength(password):
     """
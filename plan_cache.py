@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+
+# Bump when the shape of a cached plan changes so old entries stop matching
+CACHE_FORMAT = 3
+
+
+def canonical_garden_key(garden_data):
+    """Build a stable cache key for a garden_data dict.
+
+    Crops are sorted and lower-cased, areas are rounded and the location is
+    normalised so that the same garden submitted twice maps to the same key.
+    """
+    crops = sorted(
+        (str(c['name']).strip().lower(), round(float(c['area']), 1))
+        for c in garden_data.get('crops', [])
+    )
+    canonical = {
+        'format': CACHE_FORMAT,
+        'location': str(garden_data.get('location', '')).strip().lower(),
+        'garden_type': garden_data.get('garden_type'),
+        'garden_size': round(float(garden_data.get('garden_size', 0)), 1),
+        'soil_type': garden_data.get('soil_type'),
+        'sunlight': garden_data.get('sunlight'),
+        'watering_frequency': garden_data.get('watering_frequency'),
+        'main_goal': garden_data.get('main_goal'),
+        'pest_prevention': bool(garden_data.get('pest_prevention')),
+        'crops': crops,
+    }
+    raw = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    """Two-tier cache for generated plans.
+
+    Tier 1 is an in-process LRU with a TTL, tier 2 is a SQLite file under
+    data/ shared by every worker process on the host.
+    """
+
+    def __init__(self, path, max_entries=256, ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS plan_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        # sqlite3's own context manager only commits; closing() also releases the file
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    def get(self, garden_data):
+        key = canonical_garden_key(garden_data)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return json.loads(value)
+                del self._memory[key]
+
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, expires_at FROM plan_cache WHERE key = ?", (key,)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Plan cache read error: {e}")
+                row = None
+            if row and row[1] > now:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                return json.loads(row[0])
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, garden_data, plan_data):
+        key = canonical_garden_key(garden_data)
+        value = json.dumps(plan_data)
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO plan_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at)
+                    )
+            except sqlite3.Error as e:
+                print(f"Plan cache write error: {e}")
+
+        with self._lock:
+            self.stats['stores'] += 1
+
+    def invalidate(self, garden_data=None):
+        """Drop one garden's entry, or every entry when garden_data is None."""
+        key = canonical_garden_key(garden_data) if garden_data is not None else None
+
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(key, None)
+
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    if key is None:
+                        conn.execute("DELETE FROM plan_cache")
+                    else:
+                        conn.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                print(f"Plan cache delete error: {e}")
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
@@ -0,0 +1,229 @@
+import re
+import json
+
+from crop_knowledge import match_crop, UNKNOWN
+
+# Section -> the type plan_result.html, the charts and PlanCrop rely on
+SECTION_TYPES = {
+    'optimized_layout': dict,
+    'estimated_yield': dict,
+    'planting_periods': dict,
+    'smart_advice': dict,
+    'additional_tips': list,
+}
+# Per-crop sections, keyed by the user's crop names
+CROP_SECTIONS = ('estimated_yield', 'planting_periods')
+
+_FENCE_RE = re.compile(r'^\s*```[\w-]*[ \t]*\n?|\n?[ \t]*```\s*$')
+
+
+def _closers(stack):
+    return "".join(reversed(stack))
+
+
+def repair_json(text):
+    """Parse a JSON answer from the model, fixing the defects LLMs commonly produce.
+
+    Handles markdown code fences, text around the object, trailing commas
+    and answers cut off before their closing braces. Returns (value, fixes);
+    raises ValueError when the text cannot be turned into JSON.
+    """
+    try:
+        return json.loads(text), []
+    except ValueError:
+        pass
+
+    fixes = []
+    if '```' in text:
+        text = _FENCE_RE.sub('', text.strip())
+        fixes.append('code_fence')
+    start = min((i for i in (text.find('{'), text.find('[')) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError("no JSON object in the answer")
+    if text[:start].strip():
+        fixes.append('leading_text')
+
+    out = []
+    stack = []
+    in_string = escape = False
+    cut = None  # (output length, open brackets) at the last comma outside a string
+    complete = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch in '}]':
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ',':
+                del out[j]
+                if 'trailing_comma' not in fixes:
+                    fixes.append('trailing_comma')
+            # A mismatched closer is taken as the one that was expected
+            if ch != stack[-1] and 'mismatched_bracket' not in fixes:
+                fixes.append('mismatched_bracket')
+            out.append(stack.pop())
+            if not stack:
+                complete = True
+                if text[i + 1:].strip():
+                    fixes.append('trailing_text')
+                break
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == '{':
+            stack.append('}')
+        elif ch == '[':
+            stack.append(']')
+        elif ch == ',':
+            cut = (len(out), tuple(stack))
+        out.append(ch)
+
+    candidates = []
+    if complete:
+        candidates.append("".join(out))
+    else:
+        fixes.append('truncated')
+        # Close what is open; failing that, drop the member that was cut off
+        tail = "".join(out) + ('"' if in_string else '')
+        candidates.append(tail.rstrip().rstrip(',') + _closers(stack))
+        if cut is not None:
+            candidates.append("".join(out[:cut[0]]) + _closers(cut[1]))
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate), fixes
+        except ValueError:
+            continue
+    raise ValueError(f"unrepairable JSON ({', '.join(fixes) or 'syntax'})")
+
+
+def match_crop_names(values, crop_names):
+    """Re-key a per-crop dict onto the user's crop names.
+
+    Keys are matched exactly, then case- and space-insensitively, then
+    through the crop table ("Tomatoes" -> "tomato"). Returns (mapped,
+    number of keys renamed, number of keys dropped).
+    """
+    by_lower = {name.strip().lower(): name for name in crop_names}
+    by_crop = {}
+    for name in crop_names:
+        by_crop.setdefault(match_crop(name), []).append(name)
+
+    mapped, renamed, dropped = {}, 0, 0
+    for key, value in values.items():
+        key = str(key)
+        name = key if key in crop_names else by_lower.get(key.strip().lower())
+        if name is None:
+            candidates = by_crop.get(match_crop(key), [])
+            if match_crop(key) != UNKNOWN and len(candidates) == 1:
+                name = candidates[0]
+        if name is None or name in mapped:
+            dropped += 1
+            continue
+        renamed += name != key
+        mapped[name] = value
+    return mapped, renamed, dropped
+
+
+class PlanValidator:
+    """Turns a model answer into a usable plan instead of discarding it.
+
+    stats counts plans that were valid as they came, plans that needed
+    repairs or had sections/crops filled from the local planner, answers
+    that could not be used at all, and 'saved' answers that json.loads
+    alone would have rejected.
+    """
+
+    def __init__(self):
+        self.stats = {'valid': 0, 'repaired': 0, 'filled': 0, 'failed': 0, 'saved': 0}
+
+    def parse(self, text):
+        """(parsed answer, JSON fixes); raises ValueError when unusable."""
+        try:
+            data, fixes = repair_json(text or '')
+        except ValueError:
+            self.stats['failed'] += 1
+            raise
+        if fixes:
+            self.stats['saved'] += 1
+        return data, fixes
+
+    def normalize(self, data, garden_data, yield_crops, fallback, fixes=()):
+        """Coerce one parsed plan onto the schema; returns (plan, filled).
+
+        yield_crops are the crops whose yields and planting periods the
+        model was asked for; fallback() builds the local plan that fills
+        any missing section or crop. filled maps each section that took
+        local values to the crops filled in it. Raises ValueError if data
+        is not a plan at all or has none of its sections.
+        """
+        if not isinstance(data, dict):
+            self.stats['failed'] += 1
+            raise ValueError(f"expected a plan object, got {type(data).__name__}")
+        fixes = list(fixes)
+        filled = {}
+
+        # "Estimated Yield", "ESTIMATED_YIELD" -> estimated_yield
+        plan = {}
+        for key, value in data.items():
+            normal = re.sub(r'[\s-]+', '_', str(key).strip()).lower()
+            if normal != key:
+                fixes.append('section_name')
+            plan[normal] = value
+
+        crop_names = [c['name'] for c in garden_data['crops']]
+        local = None
+        for section, kind in SECTION_TYPES.items():
+            value = plan.get(section)
+            if kind is list and isinstance(value, str):
+                value = [value]
+                fixes.append(f'{section}_as_list')
+            if not isinstance(value, kind):
+                if local is None:
+                    local = fallback()
+                value = local.get(section, kind())
+                filled[section] = list(yield_crops) if section in CROP_SECTIONS else []
+            elif section in CROP_SECTIONS:
+                value, renamed, dropped = match_crop_names(value, crop_names)
+                if renamed or dropped:
+                    fixes.append('crop_names')
+                gaps = [name for name in yield_crops if name not in value]
+                if gaps:
+                    if local is None:
+                        local = fallback()
+                    filled[section] = [name for name in gaps if name in local.get(section, {})]
+                    for name in filled[section]:
+                        value[name] = local[section][name]
+            plan[section] = value
+
+        if len(filled) == len(SECTION_TYPES):
+            # Nothing in it was a plan; let the caller fall back openly
+            self.stats['failed'] += 1
+            raise ValueError("answer has none of the plan sections")
+
+        if not yield_crops:
+            # Every crop is known from cached fragments; _merge_fragments fills these
+            for section in CROP_SECTIONS:
+                if section in filled:
+                    plan[section] = {}
+                    del filled[section]
+
+        if fixes:
+            self.stats['repaired'] += 1
+        if filled:
+            self.stats['filled'] += 1
+        if not fixes and not filled:
+            self.stats['valid'] += 1
+        if fixes or filled:
+            print(f"Gemini answer repaired ({', '.join(dict.fromkeys(fixes)) or 'none'}), "
+                  f"filled from local plan ({', '.join(filled) or 'none'})")
+        return plan, filled
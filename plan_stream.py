@@ -0,0 +1,65 @@
+import json
+
+# Top-level plan sections, in the order the prompt asks for them
+PLAN_SECTIONS = ('optimized_layout', 'estimated_yield', 'planting_periods', 'smart_advice', 'additional_tips')
+
+
+class PlanSectionParser:
+    """Picks complete top-level members out of a JSON object as it streams in.
+
+    feed() takes the next chunk of text and returns the (key, value) pairs
+    whose values finished in it, so a section can be shown before the rest
+    of the answer has been generated.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        members = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._member(i))
+            elif ch == ',' and self._depth == 1:
+                members.extend(self._member(i))
+        self._pos = len(text)
+        return members
+
+    def _member(self, end):
+        segment = self.text[self._member_start:end]
+        self._member_start = end + 1
+        if not segment.strip():
+            return []
+        try:
+            return list(json.loads('{' + segment + '}').items())
+        except ValueError:
+            # Not previewed; the full text in self.text is repaired and parsed at the end
+            return []
+
+
+def sse(event, data):
+    """One Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,125 @@
+"""Opt-in cProfile hook for live requests.
+
+RequestProfiler wraps the WSGI app and profiles a sampled fraction of
+requests, plus any request whose X-Profile header carries the profile
+token. Each profile is dumped as a .prof file (open it with pstats or
+snakeviz) whose name records when it ran, how long it took and what it
+was, so the admin page can list the slowest ones without reading them.
+The directory keeps only the newest `keep` files.
+
+When PROFILER_ENABLED is off the middleware is not installed at all.
+"""
+import io
+import os
+import re
+import time
+import pstats
+import random
+import secrets
+import cProfile
+import tempfile
+import threading
+
+# <started ms>-<duration ms>-<method>-<path slug>.prof
+PROFILE_RE = re.compile(r'^(\d+)-(\d+)-([A-Z]+)-([\w.-]*)\.prof$')
+
+
+def _slug(path):
+    return re.sub(r'[^\w.-]+', '_', path.strip('/'))[:80] or 'index'
+
+
+class RequestProfiler:
+    """WSGI middleware; only the view runs under the profiler, not the
+    iteration of a streamed response body."""
+
+    def __init__(self, app, directory, sample_rate=0.0, token=None, keep=50):
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.keep = keep
+        # One profile at a time: cProfile can't nest, and it bounds the overhead
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _wanted(self, environ):
+        if self.token:
+            header = environ.get('HTTP_X_PROFILE', '')
+            if header and secrets.compare_digest(header, self.token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ) or not self._lock.acquire(blocking=False):
+            return self.app(environ, start_response)
+        try:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler (a debugger, coverage) already owns the hook
+                return self.app(environ, start_response)
+            started = time.time()
+            try:
+                return self.app(environ, start_response)
+            finally:
+                profile.disable()
+                self._save(profile, started, time.time() - started, environ)
+        finally:
+            self._lock.release()
+
+    def _save(self, profile, started, elapsed, environ):
+        name = (f"{int(started * 1000)}-{int(elapsed * 1000)}-"
+                f"{environ.get('REQUEST_METHOD', 'GET')}-{_slug(environ.get('PATH_INFO', ''))}.prof")
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            os.close(fd)
+            profile.dump_stats(tmp_path)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+            self._rotate()
+        except (OSError, TypeError) as e:
+            print(f"Could not save request profile: {e}")
+
+    def _rotate(self):
+        names = sorted(n for n in os.listdir(self.directory) if PROFILE_RE.match(n))
+        for name in names[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+def list_profiles(directory, limit=20):
+    """The slowest saved profiles, newest first among equals."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    found = []
+    for name in names:
+        match = PROFILE_RE.match(name)
+        if match:
+            started, duration, method, path = match.groups()
+            found.append((int(duration), int(started), method, path, name))
+    found.sort(reverse=True)
+    return [{
+        'name': name,
+        'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started / 1000)),
+        'duration_ms': duration,
+        'method': method,
+        'path': '/' if path == 'index' else '/' + path,
+    } for duration, started, method, path, name in found[:limit]]
+
+
+def profile_path(directory, name):
+    """Path of a saved profile; raises ValueError for anything else."""
+    if not PROFILE_RE.match(name or ''):
+        raise ValueError(f"Invalid profile name: {name!r}")
+    return os.path.join(directory, name)
+
+
+def profile_report(path, sort='cumulative', lines=40):
+    """pstats text for one profile, the top `lines` functions by `sort`."""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(lines)
+    return out.getvalue()
@@ -0,0 +1,210 @@
+"""Gemini prompts built from templates compiled once at import.
+
+The templates carry no indentation padding, and the yield guidelines only
+list the crop categories a garden actually grows, so a two-crop garden no
+longer pays for all sixteen guideline rows on every request. Greenhouse
+and open-ground gardens only see the ranges for their own environment.
+"""
+import re
+import string
+from functools import lru_cache
+
+from crop_knowledge import crop_category, yield_guidelines
+
+GUIDELINES_HEADER = "IMPORTANT YIELD GUIDELINES - Use these realistic ranges PER 100 SQM and SCALE APPROPRIATELY for the actual garden size:"
+GUIDELINES_FOOTER = """DO NOT EXCEED THESE RANGES. Be conservative and realistic, not optimistic.
+SCALE the yield based on the actual garden size. If garden is 50 sqm, use half of these values."""
+KNOWN_YIELDS = "Yields and planting periods for these crops are already known. DO NOT include estimated_yield or planting_periods."
+
+ROLE = "ROLE: Professional Horticulture Consultant. You are an expert in vegetable gardening and crop yield prediction."
+
+GARDEN_CONTEXT = """- Location: {location} climate
+- Garden size: {garden_size} sqm
+- Soil type: {soil_type}
+- Sunlight: {sunlight}
+- Growing environment: {garden_type}
+- Main goal: {main_goal}
+- Include pest prevention tips: {pest_prevention}"""
+
+GARDEN_PROMPT = ROLE + """
+
+CONTEXT:
+""" + GARDEN_CONTEXT + """
+
+CROPS TO PLAN: {crops_list}
+
+{guidelines}
+
+TASK: Generate a comprehensive, data-driven garden plan for this specific location and garden size.
+
+IMPORTANT:
+1. Scale ALL yields to the ACTUAL garden size ({garden_size} sqm), not per 100 sqm
+2. Be conservative - it's better to underestimate than overestimate
+3. Consider the specific growing environment (field vs greenhouse)
+4. Account for crop spacing and companion planting
+
+REQUIRED JSON STRUCTURE:
+{structure}"""
+
+PACKED_PROMPT = ROLE + """
+
+You are planning {count} SEPARATE gardens. Plan each one independently.
+{blocks}
+
+{guidelines}
+
+TASK: Generate a comprehensive, data-driven plan for EACH garden above.
+
+IMPORTANT:
+1. Scale ALL yields to each garden's ACTUAL size, not per 100 sqm
+2. Be conservative - it's better to underestimate than overestimate
+3. Consider each garden's growing environment (field vs greenhouse)
+4. Account for crop spacing and companion planting
+
+REQUIRED JSON STRUCTURE:
+{{"plans": [ one object per garden, in the order above, each shaped like:
+{structure}
+]}}"""
+
+PACKED_GARDEN = "GARDEN {number}:\n" + GARDEN_CONTEXT + "\n- Crops: {crops_list}"
+
+YIELD_STRUCTURE = """
+"estimated_yield": { "crop_name": "range in kg/season (scaled to garden size)" },
+"planting_periods": { "crop_name": "sowing month - harvest month" },"""
+
+PLAN_STRUCTURE = """{{
+"optimized_layout": {{
+  "crop_distribution": {{ "crop_name": "percentage%" }},
+  "spatial_arrangement": "Detailed description of how to arrange plants",
+  "companion_planting": ["list of good companions", "plants to avoid"],
+  "crop_rotation": "Rotation strategy for next season"
+}},<yields>
+"smart_advice": {{
+  "irrigation": "Specific watering schedule and method",
+  "soil_management": "Fertilizer and amendment recommendations",
+  "local_risks": "Climate-specific challenges for {location}",
+  "pest_prevention": "Organic pest control methods" if {pest_prevention} else "Standard pest monitoring"
+}},
+"additional_tips": ["tip1", "tip2", "tip3"]
+}}"""
+# Indexed by include_yields
+STRUCTURES = (
+    PLAN_STRUCTURE.replace('<yields>', ''),
+    PLAN_STRUCTURE.replace('<yields>', YIELD_STRUCTURE.replace('{', '{{').replace('}', '}}'))
+)
+
+
+
+def compile_template(template):
+    """Parse a str.format template once; the returned render(values) only joins strings."""
+    parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+
+    def render(values):
+        out = []
+        for literal, field in parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(values[field]))
+        return "".join(out)
+    return render
+
+
+render_garden = compile_template(GARDEN_PROMPT)
+render_packed = compile_template(PACKED_PROMPT)
+render_packed_garden = compile_template(PACKED_GARDEN)
+render_structure = tuple(compile_template(s) for s in STRUCTURES)
+
+PACKED_STRUCTURE = render_structure[1]({'location': 'that garden', 'pest_prevention': 'that garden asked for pest tips'})
+
+# Word-ish pieces the way a BPE tokenizer splits English: a word (with its
+# leading space) per ~6 letters, digits in threes, each symbol, each newline run
+_TOKEN_PIECES = re.compile(r" ?[A-Za-z]{1,6}| ?\d{1,3}|\n+|\s+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text):
+    """Local prompt token estimate, no network call."""
+    return len(_TOKEN_PIECES.findall(text))
+
+
+@lru_cache(maxsize=512)
+def guidelines_block(categories, garden_type=None):
+    """Yield guideline block for a frozenset of categories (all when None) and growing environment."""
+    rows = yield_guidelines(categories, garden_type)
+    return "\n".join([GUIDELINES_HEADER] + rows + ["", GUIDELINES_FOOTER])
+
+
+def relevant_categories(crop_names):
+    """Guideline categories for the crops; None (the full table) if any is unknown."""
+    categories = set()
+    for name in crop_names:
+        category = crop_category(name)
+        if category is None:
+            return None
+        categories.add(category)
+    return frozenset(categories)
+
+
+def _crops_list(data):
+    return ", ".join([f"{c['name']} ({c['area']}sqm)" for c in data.get('crops', [])])
+
+
+def _context(data):
+    return {key: data.get(key) for key in
+            ('location', 'garden_size', 'soil_type', 'sunlight', 'garden_type', 'main_goal', 'pest_prevention')}
+
+
+def garden_prompt(data, yield_crops=None):
+    """Prompt for one garden; yield_crops limits yields/periods to crops we don't already know."""
+    crops = data.get('crops', [])
+    if yield_crops is None:
+        yield_crops = [c['name'] for c in crops]
+
+    if not yield_crops:
+        guidelines = KNOWN_YIELDS
+    else:
+        guidelines = guidelines_block(relevant_categories(yield_crops), data.get('garden_type'))
+        if len(yield_crops) != len(crops):
+            guidelines += f"\nONLY include estimated_yield and planting_periods entries for: {', '.join(yield_crops)}"
+
+    values = _context(data)
+    values['structure'] = render_structure[bool(yield_crops)](values)
+    values['crops_list'] = _crops_list(data)
+    values['guidelines'] = guidelines
+    return render_garden(values)
+
+
+def packed_prompt(gardens):
+    """One prompt covering several gardens; answers come back as a "plans" list in order."""
+    blocks = "\n\n".join(
+        render_packed_garden(dict(_context(data), number=i, crops_list=_crops_list(data)))
+        for i, data in enumerate(gardens, 1)
+    )
+    names = [c['name'] for data in gardens for c in data.get('crops', [])]
+    return render_packed({
+        'count': len(gardens),
+        'blocks': blocks,
+        'guidelines': guidelines_block(relevant_categories(names)),
+        'structure': PACKED_STRUCTURE,
+    })
+
+
+class PromptTokenCounter:
+    """Counts prompt tokens with the SDK's count_tokens or the local estimate.
+
+    The SDK count is exact but costs a round trip to the API, so 'local' is
+    the default; any SDK error falls back to the estimate.
+    """
+
+    def __init__(self, client=None, model=None, method='local'):
+        self.client = client
+        self.model = model
+        self.method = method if client is not None else 'local'
+
+    def count(self, prompt):
+        """(tokens, method used)."""
+        if self.method == 'sdk':
+            try:
+                return self.client.models.count_tokens(model=self.model, contents=prompt).total_tokens, 'sdk'
+            except Exception as e:
+                print(f"count_tokens failed, using the local estimate: {e}")
+        return estimate_tokens(prompt), 'local'
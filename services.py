@@ -0,0 +1,136 @@
+"""The app's long-lived components, built on first use.
+
+GardenServices holds the generator, chart caches, job pool, dashboard
+cache, batch planner, user cache and password hasher for one Flask app.
+Nothing is constructed (and google.genai, NumPy and matplotlib are not
+imported) until a request first needs it, so importing the app and
+forking workers stay cheap. Components read their settings from the
+app's config. preload_modules() does the imports without building
+anything, for servers that import the app once and fork workers from it.
+"""
+import threading
+
+
+def preload_modules(chart_renderer='matplotlib'):
+    """Import the heavy modules so forked workers share their pages.
+
+    Builds no clients, pools or connections: those do not survive a fork
+    and are still created in each worker on first use.
+    """
+    import ai_generator  # noqa: F401 (google.genai)
+    import analytics  # noqa: F401 (NumPy)
+    if chart_renderer == 'matplotlib':
+        from charts import _matplotlib
+        _matplotlib()
+
+
+class GardenServices:
+    def __init__(self, app):
+        self.app = app
+        # Settings come from the app, so create_app(config) overrides reach every component
+        self.config = app.config
+        self._built = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name):
+        component = self._built.get(name)
+        if component is None:
+            with self._lock:
+                component = self._built.get(name)
+                if component is None:
+                    component = self._built[name] = getattr(self, f'_build_{name}')()
+        return component
+
+    def peek(self, name):
+        """The component if it has been built, else None (never builds it)."""
+        return self._built.get(name)
+
+    @property
+    def ai_generator(self):
+        return self._get('ai_generator')
+
+    @property
+    def chart_store(self):
+        return self._get('chart_store')
+
+    @property
+    def chart_renders(self):
+        return self._get('chart_renders')
+
+    @property
+    def plan_jobs(self):
+        return self._get('plan_jobs')
+
+    @property
+    def dashboards(self):
+        return self._get('dashboards')
+
+    @property
+    def batch_planner(self):
+        return self._get('batch_planner')
+
+    @property
+    def user_cache(self):
+        return self._get('user_cache')
+
+    @property
+    def password_hasher(self):
+        return self._get('password_hasher')
+
+    def _build_ai_generator(self):
+        from ai_generator import GardenAIGenerator
+        return GardenAIGenerator(self.config)
+
+    def _build_chart_store(self):
+        from chart_store import ChartStore
+        return ChartStore(self.config['CHART_STORE_DIR'])
+
+    def _build_chart_renders(self):
+        from charts import ChartRenderCache
+        return ChartRenderCache(
+            self.config['CHART_RENDER_CACHE_SIZE'],
+            renderer=self.config['CHART_RENDERER'],
+            processes=self.config['CHART_RENDER_PROCESSES']
+        )
+
+    def _build_plan_jobs(self):
+        # Background pool for job-mode plan generation
+        from job_queue import PlanJobQueue
+        return PlanJobQueue(
+            self.app, self.ai_generator,
+            max_workers=self.config['PLAN_JOB_WORKERS'],
+            max_pending=self.config['PLAN_JOB_MAX_PENDING'],
+            use_async=self.config['PLAN_JOBS_ASYNC']
+        )
+
+    def _build_dashboards(self):
+        from analytics import DashboardCache
+        return DashboardCache(self.config['DASHBOARD_CACHE_USERS'])
+
+    def _build_batch_planner(self):
+        from batch_planner import BatchPlanner
+        return BatchPlanner(
+            self.ai_generator,
+            max_concurrency=self.config['BATCH_MAX_CONCURRENCY'],
+            pack_size=self.config['BATCH_PACK_SIZE'],
+            pack_max_crops=self.config['BATCH_PACK_MAX_CROPS']
+        )
+
+    def _build_user_cache(self):
+        from user_cache import UserCache
+        return UserCache(self.config['USER_CACHE_SIZE'], ttl=self.config['USER_CACHE_TTL'])
+
+    def _build_password_hasher(self):
+        from password_utils import PasswordHasher
+        return PasswordHasher(
+            self.config['PASSWORD_HASH_METHOD'],
+            max_workers=self.config['PASSWORD_HASH_WORKERS'],
+            max_queue=self.config['PASSWORD_HASH_QUEUE']
+        )
+
+    def shutdown(self):
+        """Stop the pools of whatever was built."""
+        for name in ('plan_jobs', 'chart_renders', 'password_hasher'):
+            component = self.peek(name)
+            if component is not None:
+                component.shutdown()
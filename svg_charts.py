@@ -0,0 +1,111 @@
+"""Pure-Python SVG versions of the plan charts.
+
+Same series, colours and titles as the matplotlib renderer in charts.py,
+without importing matplotlib. Output is a few KB of text that gzips well.
+"""
+import math
+from xml.sax.saxutils import escape, quoteattr
+
+PIE_COLORS = ['#6A8D53', '#8FB377', '#A9C296', '#D1D9C0']
+BAR_COLOR = '#6A8D53'
+FONT = 'font-family="DejaVu Sans, Arial, sans-serif"'
+
+
+def _num(value):
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+
+def _text(x, y, label, size=12, anchor='middle', extra=''):
+    return (f'<text x="{_num(x)}" y="{_num(y)}" font-size="{size}" text-anchor="{anchor}" '
+            f'dominant-baseline="middle"{extra}>{escape(str(label))}</text>')
+
+
+def _document(width, height, body):
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" {FONT}>'
+            + "".join(body) + '</svg>').encode('utf-8')
+
+
+def render_pie_svg(data, width=560, height=460):
+    """Pie chart starting at 140 degrees, counter-clockwise like plt.pie."""
+    cx, cy, r = width / 2, height / 2 + 16, 160
+    body = [_text(cx, 22, "Garden Area Distribution", size=15)]
+
+    values = [max(float(v), 0.0) for v in data['values']]
+    total = sum(values)
+    angle = 140.0
+    for i, (label, value) in enumerate(zip(data['labels'], values)):
+        if total <= 0 or value <= 0:
+            continue
+        share = value / total
+        sweep = share * 360.0
+        color = PIE_COLORS[i % len(PIE_COLORS)]
+        start, end = math.radians(angle), math.radians(angle + sweep)
+
+        if share >= 0.9999:
+            body.append(f'<circle cx="{_num(cx)}" cy="{_num(cy)}" r="{r}" fill="{color}"/>')
+        else:
+            # SVG y grows downwards, so counter-clockwise means subtracting sin
+            x1, y1 = cx + r * math.cos(start), cy - r * math.sin(start)
+            x2, y2 = cx + r * math.cos(end), cy - r * math.sin(end)
+            large = 1 if sweep > 180 else 0
+            body.append(
+                f'<path d="M{_num(cx)},{_num(cy)} L{_num(x1)},{_num(y1)} '
+                f'A{r},{r} 0 {large} 0 {_num(x2)},{_num(y2)} Z" fill="{color}"/>'
+            )
+
+        mid = math.radians(angle + sweep / 2)
+        cos_mid, sin_mid = math.cos(mid), math.sin(mid)
+        body.append(_text(cx + 0.6 * r * cos_mid, cy - 0.6 * r * sin_mid, f"{share * 100:.1f}%"))
+        body.append(_text(cx + 1.1 * r * cos_mid, cy - 1.1 * r * sin_mid, label,
+                          anchor='start' if cos_mid >= 0 else 'end'))
+        angle += sweep
+
+    return _document(width, height, body)
+
+
+def _nice_ticks(top, count=5):
+    """Round tick values from 0 to at least top (1, 2, 2.5 or 5 times 10^n apart)."""
+    if top <= 0:
+        return [0, 1]
+    raw = top / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    ticks = [0.0]
+    while ticks[-1] < top:
+        ticks.append(ticks[-1] + step)
+    return ticks
+
+
+def render_bar_svg(data, width=720, height=460):
+    """Bar chart of average yields with rotated crop labels."""
+    left, right, top, bottom = 70, 20, 40, 110
+    plot_w, plot_h = width - left - right, height - top - bottom
+    body = [_text(left + plot_w / 2, 20, "Yield Projections", size=15)]
+
+    values = [float(v) for v in data['values']]
+    ticks = _nice_ticks(max(values, default=0))
+    y_max = ticks[-1]
+
+    def y_at(value):
+        return top + plot_h - (value / y_max) * plot_h
+
+    for tick in ticks:
+        y = y_at(tick)
+        body.append(f'<line x1="{left - 4}" y1="{_num(y)}" x2="{left}" y2="{_num(y)}" stroke="#000"/>')
+        body.append(_text(left - 8, y, _num(tick), size=11, anchor='end'))
+
+    slot = plot_w / max(len(values), 1)
+    for i, (label, value) in enumerate(zip(data['labels'], values)):
+        x = left + slot * i + slot * 0.1
+        y = y_at(max(value, 0))
+        body.append(f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(slot * 0.8)}" '
+                    f'height="{_num(top + plot_h - y)}" fill="{BAR_COLOR}"/>')
+        label_x, label_y = left + slot * (i + 0.5), top + plot_h + 12
+        body.append(_text(label_x, label_y, label, size=11, anchor='end',
+                          extra=f' transform={quoteattr(f"rotate(-45 {_num(label_x)} {_num(label_y)})")}'))
+
+    body.append(f'<rect x="{left}" y="{top}" width="{plot_w}" height="{plot_h}" fill="none" stroke="#000"/>')
+    body.append(_text(18, top + plot_h / 2, "Estimated Yield (Average kg)", size=12,
+                      extra=f' transform="rotate(-90 18 {_num(top + plot_h / 2)})"'))
+    return _document(width, height, body)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from config import Config
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'garden.db'}"
+        CHART_STORE_DIR = str(tmp_path / 'charts')
+        PROFILER_ENABLED = False
+
+    return create_app(TestConfig)
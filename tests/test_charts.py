@@ -0,0 +1,51 @@
+import os
+import time
+import signal
+
+import pytest
+
+from charts import ChartRenderCache
+
+pytest.importorskip('matplotlib')
+
+PNG = b'\x89PNG'
+
+
+def series(n):
+    return {'pie': {'labels': ['Tomato', 'Carrot'], 'values': [n, 3]},
+            'bar': {'labels': ['Tomato', 'Carrot'], 'values': [n, 7]}}
+
+
+def kill_workers(cache):
+    pids = list(cache._pool._processes)
+    for pid in pids:
+        os.kill(pid, signal.SIGKILL)
+    # Let the pool's manager thread notice and mark the pool broken
+    deadline = time.time() + 10
+    while not cache._pool._broken and time.time() < deadline:
+        time.sleep(0.05)
+    assert cache._pool._broken
+
+
+def test_render_recovers_after_pool_breaks_while_idle():
+    cache = ChartRenderCache(processes=1)
+    try:
+        assert cache.render('pie', series(1)).startswith(PNG)
+        kill_workers(cache)
+
+        data, mimetype = cache.render_with_fallback('pie', series(2))
+        assert mimetype == 'image/png' and data.startswith(PNG)
+        # The broken pool was replaced, so later charts go back to the pool
+        for n in (3, 4):
+            data, mimetype = cache.render_with_fallback('bar', series(n))
+            assert mimetype == 'image/png' and data.startswith(PNG)
+        assert cache._pool is not None and not cache._pool._broken
+    finally:
+        cache.shutdown()
+
+
+def test_failed_render_falls_back_to_svg():
+    cache = ChartRenderCache(processes=0)
+    cache._render_functions = {'pie': lambda data: 1 / 0}
+    data, mimetype = cache.render_with_fallback('pie', series(1))
+    assert mimetype == 'image/svg+xml' and data.startswith(b'<svg')
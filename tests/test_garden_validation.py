@@ -0,0 +1,39 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from app import parse_garden_form, parse_garden_spec
+
+
+def form(size='20', areas=('5', '4')):
+    return MultiDict([('location', 'Almaty'), ('garden_size', size)]
+                     + [('crop_name[]', f'Crop {i}') for i in range(len(areas))]
+                     + [('crop_area[]', area) for area in areas])
+
+
+def spec(size=20, areas=(5, 4)):
+    return {'location': 'Almaty', 'garden_size': size,
+            'crops': [{'name': f'Crop {i}', 'area': area} for i, area in enumerate(areas)]}
+
+
+def test_valid_garden_passes(app):
+    with app.test_request_context():
+        assert parse_garden_form(form())['garden_size'] == 20
+        assert len(parse_garden_spec(spec())['crops']) == 2
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', 'NaN', 'Infinity'])
+def test_form_rejects_non_finite_sizes(app, value):
+    with app.test_request_context():
+        with pytest.raises(ValueError, match='must be positive'):
+            parse_garden_form(form(size=value))
+        with pytest.raises(ValueError, match='must be positive'):
+            parse_garden_form(form(areas=('5', value)))
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), 'nan', 'inf'])
+def test_batch_spec_rejects_non_finite_sizes(app, value):
+    with app.test_request_context():
+        with pytest.raises(ValueError, match='must be positive'):
+            parse_garden_spec(spec(size=value))
+        with pytest.raises(ValueError, match='must be positive'):
+            parse_garden_spec(spec(areas=(value, 4)))
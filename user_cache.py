@@ -0,0 +1,80 @@
+import time
+import threading
+from collections import OrderedDict
+
+from database import db
+from models import User
+
+
+class UserSnapshot:
+    """What a request needs of the logged-in user, detached from the session.
+
+    Stands in for User as Flask-Login's current_user: no password hash,
+    no lazy relationships, and nothing to refresh from the database.
+    Views that change the user load the User row themselves.
+    """
+    __slots__ = ('id', 'username', 'email', 'created_at')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, email, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.created_at)
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        return isinstance(other, UserSnapshot) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class UserCache:
+    """Bounded LRU of UserSnapshots with a TTL, behind the Flask-Login user loader.
+
+    Routes that change a user call invalidate(). Entries are per process,
+    so another worker may serve a snapshot up to ttl seconds old.
+    """
+
+    def __init__(self, max_users=1024, ttl=60):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
@@ -0,0 +1,8 @@
+"""WSGI entry point: gunicorn wsgi:app
+
+With PRELOAD_MODULES=1 and gunicorn --preload the heavy imports happen
+once in the master and are shared by every forked worker.
+"""
+from app import create_app
+
+app = create_app()